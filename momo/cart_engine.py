@@ -0,0 +1,134 @@
+"""
+Cart engine: the single place where cart contents and totals are computed.
+
+A `Cart` wraps the compact `{item_id: quantity}` mapping kept by the cart
+store. The subtotal is computed once when the cart is loaded and then
+adjusted incrementally by each add/update/remove, using Decimal arithmetic so
+money never picks up float rounding errors. Prices always come from the menu
+catalog.
+
+`Cart.apply(ops)` applies a batch of operations atomically: every operation
+is validated against a copy first, so a bad operation leaves the cart
+untouched.
+"""
+from decimal import Decimal
+
+FREE_DELIVERY_THRESHOLD = Decimal('30')
+DELIVERY_FEE = Decimal('2')
+MAX_QUANTITY = 99
+
+_ZERO = Decimal('0')
+
+
+class Cart:
+    def __init__(self, catalog, quantities=None):
+        self._catalog = catalog
+        self.quantities = {}
+        self.subtotal = _ZERO
+        for item_id, quantity in (quantities or {}).items():
+            # Silently drop items that have been taken off the menu since the cart was saved
+            if item_id in catalog:
+                self._set(item_id, int(quantity))
+
+    # -- mutation --------------------------------------------------------
+
+    def _price(self, item_id):
+        item = self._catalog.get(item_id)
+        if item is None:
+            raise ValueError(f'Unknown menu item: {item_id}')
+        return item.price
+
+    def _set(self, item_id, quantity):
+        price = self._price(item_id)
+        if quantity > MAX_QUANTITY:
+            raise ValueError(f'Quantity for {item_id} cannot exceed {MAX_QUANTITY}')
+        previous = self.quantities.get(item_id, 0)
+        if quantity <= 0:
+            self.quantities.pop(item_id, None)
+            quantity = 0
+        else:
+            self.quantities[item_id] = quantity
+        self.subtotal += price * (quantity - previous)
+
+    def add(self, item_id, quantity=1):
+        quantity = int(quantity)
+        if quantity < 1:
+            raise ValueError('Quantity must be at least 1')
+        self._set(item_id, self.quantities.get(item_id, 0) + quantity)
+
+    def update(self, item_id, quantity):
+        """Set the quantity of an item; zero or less removes it."""
+        self._set(item_id, int(quantity))
+
+    def remove(self, item_id):
+        if item_id in self.quantities:
+            self._set(item_id, 0)
+
+    def clear(self):
+        self.quantities = {}
+        self.subtotal = _ZERO
+
+    def copy(self):
+        other = Cart(self._catalog)
+        other.quantities = dict(self.quantities)
+        other.subtotal = self.subtotal
+        return other
+
+    def apply(self, ops):
+        """
+        Apply a list of operations and return the resulting Cart, leaving `self`
+        unchanged. Each op is a dict: {"op": "add"|"update"|"remove"|"clear",
+        "id": item_id, "quantity": n}. Raises ValueError if any op is invalid.
+        """
+        result = self.copy()
+        for op in ops:
+            if not isinstance(op, dict):
+                raise ValueError(f'Cart operation must be an object, got {op!r}')
+            kind = op.get('op', 'update')
+            if kind == 'add':
+                result.add(op.get('id'), op.get('quantity', 1))
+            elif kind == 'update':
+                result.update(op.get('id'), op.get('quantity', 1))
+            elif kind == 'remove':
+                result.remove(op.get('id'))
+            elif kind == 'clear':
+                result.clear()
+            else:
+                raise ValueError(f'Unknown cart operation: {kind}')
+        return result
+
+    # -- reading ---------------------------------------------------------
+
+    def __bool__(self):
+        return bool(self.quantities)
+
+    def __len__(self):
+        return len(self.quantities)
+
+    def lines(self):
+        """Display lines for templates and order records, built from the catalog."""
+        lines = []
+        for item_id, quantity in self.quantities.items():
+            item = self._catalog.get(item_id)
+            lines.append({
+                "id": item.id,
+                "name": item.name,
+                "image": item.image,
+                "price": item.price,
+                "quantity": quantity,
+                "category": ' '.join(item.categories),
+                "spicy": item.spicy
+            })
+        return lines
+
+    def totals(self):
+        delivery_fee = _ZERO if self.subtotal >= FREE_DELIVERY_THRESHOLD else DELIVERY_FEE
+        return {
+            'subtotal': self.subtotal,
+            'delivery_fee': delivery_fee,
+            'total': self.subtotal + delivery_fee,
+            'free_delivery_remaining': max(_ZERO, FREE_DELIVERY_THRESHOLD - self.subtotal)
+        }
+
+    def totals_json(self):
+        return {key: float(value) for key, value in self.totals().items()}
@@ -0,0 +1,107 @@
+"""
+Server-side cart storage.
+
+The browser session only carries a short random cart token; the cart itself
+lives in one of these stores as a compact `{item_id: quantity}` mapping (names
+and prices come from the menu catalog). Adding, updating or removing an item
+is a dict operation regardless of cart size, and the session cookie stays a
+few dozen bytes instead of growing with every item.
+
+  - MemoryCartStore: in-process LRU with TTL eviction. Fastest, but each
+    gunicorn worker has its own copy, so only use it with a single worker.
+  - SQLiteCartStore: a local WAL-mode SQLite file shared by all workers on
+    the host.
+
+Select with CART_STORE=sqlite|memory (see `create_cart_store`); the app
+defaults to sqlite.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from sqlite_util import ThreadLocalDB
+
+
+class MemoryCartStore:
+    def __init__(self, ttl=7 * 24 * 3600, max_entries=10000):
+        self.ttl = float(ttl)
+        self.max_entries = int(max_entries)
+        self._carts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token):
+        """Return a copy of the cart for `token` ({} when missing or expired)."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._carts.get(token)
+            if entry is None:
+                return {}
+            expires_at, cart = entry
+            if expires_at <= now:
+                del self._carts[token]
+                return {}
+            self._carts.move_to_end(token)
+            return dict(cart)
+
+    def save(self, token, cart):
+        with self._lock:
+            self._carts[token] = (time.monotonic() + self.ttl, dict(cart))
+            self._carts.move_to_end(token)
+            while len(self._carts) > self.max_entries:
+                self._carts.popitem(last=False)
+
+    def delete(self, token):
+        with self._lock:
+            self._carts.pop(token, None)
+
+    def __len__(self):
+        return len(self._carts)
+
+
+class SQLiteCartStore:
+    # Expired rows are purged on every Nth save rather than on each request.
+    PURGE_EVERY = 500
+
+    def __init__(self, path, ttl=7 * 24 * 3600):
+        self.ttl = float(ttl)
+        self._db = ThreadLocalDB(path)
+        self._writes = 0
+        self._db.get().execute('''
+            CREATE TABLE IF NOT EXISTS carts (
+                token TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        ''')
+
+    def get(self, token):
+        row = self._db.get().execute(
+            "SELECT data FROM carts WHERE token = ? AND expires_at > ?", (token, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def save(self, token, cart):
+        conn = self._db.get()
+        conn.execute(
+            "INSERT INTO carts (token, data, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(token) DO UPDATE SET data = excluded.data, expires_at = excluded.expires_at",
+            (token, json.dumps(cart, separators=(',', ':')), time.time() + self.ttl)
+        )
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            conn.execute("DELETE FROM carts WHERE expires_at <= ?", (time.time(),))
+
+    def delete(self, token):
+        self._db.get().execute("DELETE FROM carts WHERE token = ?", (token,))
+
+
+def create_cart_store(kind='memory', path=None, ttl=7 * 24 * 3600, max_entries=10000):
+    kind = (kind or 'memory').lower()
+    if kind == 'memory':
+        return MemoryCartStore(ttl=ttl, max_entries=max_entries)
+    if kind == 'sqlite':
+        if not path:
+            raise ValueError('CART_STORE=sqlite requires CART_STORE_PATH')
+        return SQLiteCartStore(path, ttl=ttl)
+    raise ValueError(f'Unknown cart store: {kind}')
@@ -0,0 +1,90 @@
+"""
+Menu catalog loaded once at startup from `menu.json`.
+
+The catalog is immutable after loading: items are namedtuples, the id index and
+per-category lists are read-only mappings built up front, and the JSON payload
+served at /api/menu (plus its ETag) is serialised once. Lookups by id are a
+single dict access, so the cart can use the catalog as the authoritative
+source for names and prices instead of trusting client-submitted values.
+"""
+import hashlib
+import json
+import os
+from collections import namedtuple
+from decimal import Decimal
+from types import MappingProxyType
+
+MENU_PATH = os.path.join(os.path.dirname(__file__), 'menu.json')
+
+_FIELDS = ('id', 'name', 'description', 'price', 'image', 'categories', 'style', 'spicy')
+
+
+class MenuItem(namedtuple('MenuItem', _FIELDS)):
+    __slots__ = ()
+
+    @property
+    def veg(self):
+        return 'veg' in self.categories
+
+    def to_dict(self):
+        data = self._asdict()
+        data['price'] = float(self.price)
+        data['categories'] = list(self.categories)
+        return data
+
+
+class Catalog:
+    def __init__(self, items):
+        self._items = tuple(items)
+        self._by_id = MappingProxyType({item.id: item for item in self._items})
+        if len(self._by_id) != len(self._items):
+            raise ValueError('Duplicate menu item ids in catalog')
+
+        by_category = {}
+        for item in self._items:
+            for category in item.categories:
+                by_category.setdefault(category, []).append(item)
+        self._by_category = MappingProxyType({k: tuple(v) for k, v in by_category.items()})
+
+        self.json = json.dumps({'items': [item.to_dict() for item in self._items]},
+                               ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self.etag = hashlib.sha256(self.json).hexdigest()[:32]
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, item_id):
+        return item_id in self._by_id
+
+    def get(self, item_id):
+        """Return the MenuItem for `item_id`, or None when it is not on the menu."""
+        return self._by_id.get(item_id)
+
+    def by_category(self, category):
+        """Return the (precomputed) tuple of items tagged with `category`."""
+        return self._by_category.get(category, ())
+
+    @property
+    def categories(self):
+        return tuple(self._by_category)
+
+
+def load_catalog(path=MENU_PATH):
+    with open(path, 'r', encoding='utf-8') as fh:
+        raw = json.load(fh)
+    items = []
+    for entry in raw:
+        items.append(MenuItem(
+            id=entry['id'],
+            name=entry['name'],
+            description=entry.get('description', ''),
+            price=Decimal(str(entry['price'])),
+            image=entry.get('image', ''),
+            categories=tuple(entry.get('categories', ())),
+            style=entry.get('style', ''),
+            spicy=bool(entry.get('spicy', False)),
+        ))
+    return Catalog(items)
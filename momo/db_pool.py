@@ -0,0 +1,231 @@
+"""
+Thread-safe database connection pool used by `app.py`.
+
+Each request borrows one connection from the pool (see `get_db()` in app.py)
+and hands it back when the app context is torn down, so concurrent requests
+served by threaded gunicorn workers never share a socket or commit each
+other's work.
+
+The pool is deliberately small and dependency free:
+  - `size` caps the number of open connections; borrowers wait up to
+    `timeout` seconds for one to be returned before `PoolTimeout` is raised.
+  - Connections idle for longer than `ping_interval` seconds are
+    health-checked on borrow and transparently replaced when dead.
+  - Connections older than `max_lifetime` seconds are recycled on borrow/return
+    so server-side timeouts (e.g. MySQL `wait_timeout`) never bite.
+  - `stats()` reports borrow counts and wait times for monitoring.
+"""
+import threading
+import time
+from collections import deque
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available within the pool timeout."""
+
+
+class _Entry:
+    __slots__ = ('conn', 'created_at', 'last_used', 'generation')
+
+    def __init__(self, conn, generation=0):
+        now = time.monotonic()
+        self.conn = conn
+        self.created_at = now
+        self.last_used = now
+        self.generation = generation
+
+
+def _close_quietly(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+class ConnectionPool:
+    def __init__(self, factory, size=5, timeout=10.0, max_lifetime=1800.0, ping_interval=30.0):
+        """
+        factory:       zero-argument callable returning a new DB-API connection
+        size:          maximum number of open connections
+        timeout:       seconds to wait for a free connection before PoolTimeout
+        max_lifetime:  seconds after which a connection is closed and replaced (0 disables)
+        ping_interval: connections idle for longer than this are health-checked on borrow
+        """
+        self._factory = factory
+        self.size = max(1, int(size))
+        self.timeout = float(timeout)
+        self.max_lifetime = float(max_lifetime)
+        self.ping_interval = float(ping_interval)
+
+        self._cond = threading.Condition()
+        self._idle = deque()
+        self._in_use = {}
+        self._open = 0
+        self._generation = 0  # bumped by close_all(); older entries are closed on release
+
+        self._stats = {
+            'borrowed': 0,
+            'waited': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+            'timeouts': 0,
+            'created': 0,
+            'recycled': 0,
+            'health_check_failures': 0,
+            'discarded': 0,
+        }
+
+    # -- borrowing -------------------------------------------------------
+
+    def acquire(self):
+        """Borrow a connection, waiting up to `timeout` seconds for a free slot."""
+        started = time.monotonic()
+        deadline = started + self.timeout
+        waited = False
+
+        while True:
+            entry = None
+            with self._cond:
+                while not self._idle and self._open >= self.size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeout(f'No database connection available after {self.timeout:.1f}s '
+                                          f'(pool size {self.size})')
+                    waited = True
+                    self._cond.wait(remaining)
+
+                if self._idle:
+                    entry = self._idle.pop()
+                else:
+                    # Reserve a slot; the (slow) connect happens outside the lock.
+                    self._open += 1
+
+            if entry is None:
+                entry = self._create()
+            elif not self._usable(entry):
+                self._discard(entry)
+                continue
+
+            wait_time = time.monotonic() - started
+            with self._cond:
+                self._in_use[id(entry.conn)] = entry
+                self._stats['borrowed'] += 1
+                if waited:
+                    self._stats['waited'] += 1
+                self._stats['wait_time_total'] += wait_time
+                if wait_time > self._stats['wait_time_max']:
+                    self._stats['wait_time_max'] = wait_time
+            return entry.conn
+
+    def release(self, conn, discard=False):
+        """Return a borrowed connection. Any open transaction is rolled back."""
+        with self._cond:
+            entry = self._in_use.pop(id(conn), None)
+        if entry is None:
+            # Not ours (or already released); nothing sensible to do but close it.
+            _close_quietly(conn)
+            return
+
+        if not discard:
+            try:
+                # Ends the implicit transaction so the next borrower does not see
+                # a stale REPEATABLE READ snapshot or uncommitted writes.
+                conn.rollback()
+            except Exception:
+                discard = True
+
+        with self._cond:
+            stale = entry.generation != self._generation
+            if not discard and (stale or self._expired(entry)):
+                self._stats['recycled'] += 1
+                discard = True
+        if discard:
+            self._discard(entry)
+            return
+
+        entry.last_used = time.monotonic()
+        with self._cond:
+            self._idle.append(entry)
+            self._cond.notify()
+
+    def warm(self, count=1, factory=None):
+        """
+        Open up to `count` idle connections ahead of traffic (raises on connect
+        failure). `factory` overrides the pool's own for these connections.
+        """
+        for _ in range(count):
+            with self._cond:
+                if self._open >= self.size:
+                    return
+                self._open += 1
+            entry = self._create(factory)
+            with self._cond:
+                self._idle.append(entry)
+                self._cond.notify()
+
+    def close_all(self):
+        """Close every idle connection. Borrowed connections are closed on release."""
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._open -= len(idle)
+            self._generation += 1
+            self._cond.notify_all()
+        for entry in idle:
+            _close_quietly(entry.conn)
+
+    def stats(self):
+        with self._cond:
+            data = dict(self._stats)
+            data.update({
+                'size': self.size,
+                'open': self._open,
+                'in_use': len(self._in_use),
+                'idle': len(self._idle),
+            })
+        borrowed = data['borrowed'] or 1
+        data['wait_time_avg'] = data['wait_time_total'] / borrowed
+        return data
+
+    # -- internals -------------------------------------------------------
+
+    def _create(self, factory=None):
+        try:
+            conn = (factory or self._factory)()
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._stats['created'] += 1
+            generation = self._generation
+        return _Entry(conn, generation)
+
+    def _discard(self, entry):
+        _close_quietly(entry.conn)
+        with self._cond:
+            self._open -= 1
+            self._stats['discarded'] += 1
+            self._cond.notify()
+
+    def _expired(self, entry):
+        return self.max_lifetime > 0 and time.monotonic() - entry.created_at >= self.max_lifetime
+
+    def _usable(self, entry):
+        if self._expired(entry):
+            with self._cond:
+                self._stats['recycled'] += 1
+            return False
+        if time.monotonic() - entry.last_used < self.ping_interval:
+            return True
+        try:
+            is_connected = getattr(entry.conn, 'is_connected', None)
+            if is_connected is None or is_connected():
+                return True
+        except Exception:
+            pass
+        with self._cond:
+            self._stats['health_check_failures'] += 1
+        return False
@@ -0,0 +1,167 @@
+"""
+Embedded SQLite database backend, selected with DATABASE_URL=sqlite:///path/to/momo.db.
+
+For single-node deployments, tests and benchmarks: no server, no network
+round trip per query. Connections look enough like mysql.connector ones for
+the rest of the app to use them unchanged:
+
+  - `%s` placeholders are translated to SQLite's `?`;
+  - `cursor(buffered=..., dictionary=...)` is accepted (SQLite cursors are
+    always buffered in the sense that matters here);
+  - DECIMAL columns come back as Decimal and TIMESTAMP columns as datetime,
+    as they do from MySQL;
+  - `is_connected()` is there for the connection pool's health check.
+
+Every pooled connection is a separate SQLite connection to the same file in
+WAL mode, so any number of requests read concurrently while one writes.
+`busy_timeout` makes a second writer wait for the first instead of failing.
+Dialect differences in the schema (AUTO_INCREMENT, information_schema,
+GET_LOCK, ...) are handled by migrations.SchemaEditor via `conn.dialect`.
+"""
+import os
+import re
+import sqlite3
+from datetime import datetime
+from decimal import Decimal
+
+_PLACEHOLDER_RE = re.compile(r'%s')
+
+
+def _convert_decimal(raw):
+    return Decimal(raw.decode('ascii'))
+
+
+def _convert_timestamp(raw):
+    return datetime.fromisoformat(raw.decode('ascii'))
+
+
+sqlite3.register_adapter(Decimal, str)
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+sqlite3.register_converter('DECIMAL', _convert_decimal)
+sqlite3.register_converter('TIMESTAMP', _convert_timestamp)
+sqlite3.register_converter('DATETIME', _convert_timestamp)
+
+
+def dialect(conn):
+    """'sqlite' for connections from this module, otherwise 'mysql'."""
+    return getattr(conn, 'dialect', 'mysql')
+
+
+def path_from_url(url):
+    """sqlite:///relative/momo.db -> relative/momo.db, sqlite:////abs/momo.db -> /abs/momo.db"""
+    if not url.startswith('sqlite:///'):
+        raise ValueError(f'Not a sqlite:/// URL: {url}')
+    path = url[len('sqlite:///'):]
+    if not path:
+        raise ValueError('DATABASE_URL=sqlite:/// needs a file path')
+    if path == ':memory:':
+        # Every pooled connection would get its own empty database
+        raise ValueError('In-memory SQLite cannot be shared by the connection pool; use a file path')
+    return path
+
+
+class SQLiteCursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, operation, params=()):
+        self._cursor.execute(_PLACEHOLDER_RE.sub('?', operation), tuple(params or ()))
+        return self
+
+    def executemany(self, operation, seq_params):
+        self._cursor.executemany(_PLACEHOLDER_RE.sub('?', operation), [tuple(p) for p in seq_params])
+        return self
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchmany(self, size=None):
+        return self._cursor.fetchmany(size or self._cursor.arraysize)
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __getattr__(self, name):
+        # lastrowid, rowcount, description, close, arraysize
+        return getattr(self._cursor, name)
+
+
+class _DictCursor(SQLiteCursor):
+    def _row(self, row):
+        if row is None:
+            return None
+        return {col[0]: value for col, value in zip(self._cursor.description, row)}
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchmany(self, size=None):
+        return [self._row(r) for r in super().fetchmany(size)]
+
+    def fetchall(self):
+        return [self._row(r) for r in self._cursor.fetchall()]
+
+    def __iter__(self):
+        return (self._row(r) for r in self._cursor)
+
+
+class SQLiteConnection:
+    dialect = 'sqlite'
+
+    def __init__(self, path, timeout=30.0):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._conn = sqlite3.connect(path, timeout=timeout, detect_types=sqlite3.PARSE_DECLTYPES,
+                                     check_same_thread=False)
+        self._closed = False
+        for pragma in (
+            'journal_mode=WAL',        # readers never block the writer (or each other)
+            'synchronous=NORMAL',      # durable at checkpoints; safe with WAL
+            f'busy_timeout={int(timeout * 1000)}',
+            'cache_size=-16000',       # ~16 MB page cache per connection
+            'temp_store=MEMORY',
+            'mmap_size=134217728',     # reads straight from the page cache
+        ):
+            self._conn.execute(f'PRAGMA {pragma}')
+
+    def cursor(self, buffered=False, dictionary=False):
+        cursor = self._conn.cursor()
+        return _DictCursor(cursor) if dictionary else SQLiteCursor(cursor)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._conn.close()
+
+    def is_connected(self):
+        if self._closed:
+            return False
+        try:
+            self._conn.execute('SELECT 1')
+            return True
+        except sqlite3.Error:
+            return False
+
+    @property
+    def in_transaction(self):
+        return self._conn.in_transaction
+
+
+def connect(url, timeout=30.0):
+    return SQLiteConnection(path_from_url(url), timeout=timeout)
@@ -0,0 +1,7 @@
+#!/bin/sh
+# Bring the database schema up to date, then start the container's command (CMD).
+# Without this an upgraded image would run against the old schema, and the app
+# refuses database requests while migrations are pending.
+set -e
+flask --app app migrate
+exec "$@"
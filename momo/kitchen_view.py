@@ -0,0 +1,241 @@
+"""
+In-memory materialised view of the kitchen's order queue.
+
+The kitchen dashboard (/kitchen, /api/kitchen) shows the orders that are not
+finished yet and how many of each dish still have to be cooked. Rather than
+re-aggregating `orders` and `order_items` on every refresh, each worker keeps
+that view in memory and maintains it incrementally on the order status
+watcher's tick (order_status.StatusWatcher), so it costs one query per tick
+however many screens are watching:
+
+  - new orders: rows past the highest `order_id` seen so far. AUTO_INCREMENT
+    ids can commit out of order (the write-behind queue and synchronous
+    checkouts race), so the last REORDER_WINDOW ids are re-read and orders
+    already seen are skipped;
+  - status changes: applied from the watcher's events; an order that leaves
+    the kitchen (out for delivery, delivered, cancelled) is dropped and its
+    dishes are taken off the prep counts, as is an order once it is ready.
+
+The view is loaded in full once per process, the first time it is used.
+Every change bumps `version`, which the JSON API uses as an ETag so idle
+dashboards revalidate for free.
+"""
+import json
+import os
+import threading
+import time
+
+from order_status import label
+
+ACTIVE_STATUSES = ('pending', 'confirmed', 'preparing', 'ready')
+PREP_STATUSES = frozenset(('pending', 'confirmed', 'preparing'))
+
+REORDER_WINDOW = 200
+
+_ORDER_COLUMNS = "order_id, order_ref, name, address, payment, total, status, created_at, items"
+
+
+def _legacy_items(raw):
+    """Lines of an order written before order_items existed (JSON in orders.items)."""
+    try:
+        items = json.loads(raw) if raw else []
+    except ValueError:
+        return []
+    return [{'item_id': it.get('id'), 'name': it.get('name'), 'quantity': int(it.get('quantity') or 0)}
+            for it in items if isinstance(it, dict)]
+
+
+class KitchenView:
+    def __init__(self, pool, watcher, batch_size=500):
+        self.pool = pool
+        self.watcher = watcher
+        self.batch_size = int(batch_size)
+        self.version = 0
+        self._orders = {}       # order_id -> order dict
+        self._dishes = {}       # dish key -> {'item_id', 'name', 'quantity', 'orders'}
+        self._max_id = None     # highest order_id read; None until loaded
+        self._seen = set()      # ids within REORDER_WINDOW of _max_id
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._pid = None
+        self._attached = False
+        self._stats = {'refreshes': 0, 'rows_read': 0, 'last_refresh_ms': 0.0}
+
+    def ensure_started(self):
+        """Load the view and hook it onto the watcher in this process (again after a fork)."""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._refresh_lock:
+            if self._pid == pid:
+                return
+            with self._lock:
+                self._orders.clear()
+                self._dishes.clear()
+                self._seen.clear()
+                self._max_id = None
+                self._snapshot = None
+                self.version += 1
+            self._refresh(())
+            self._pid = pid
+            # The listener list survives a fork along with the watcher
+            attach, self._attached = not self._attached, True
+        if attach:
+            self.watcher.add_listener(self.on_tick)
+        else:
+            self.watcher.ensure_started()
+
+    # -- maintenance (watcher thread) ------------------------------------
+
+    def on_tick(self, events):
+        if self._pid != os.getpid():
+            return
+        with self._refresh_lock:
+            self._refresh(events)
+
+    def _refresh(self, events):
+        started = time.perf_counter()
+        with self._lock:
+            changed = False
+            for event in events:
+                changed |= self._set_status(event['order_id'], event['status'])
+
+        conn = self.pool.acquire()
+        try:
+            cur = conn.cursor()
+            try:
+                if self._max_id is None:
+                    rows = self._bootstrap(cur)
+                else:
+                    rows = self._new_orders(cur)
+            finally:
+                cur.close()
+        except Exception:
+            self.pool.release(conn, discard=True)
+            raise
+        self.pool.release(conn)
+
+        with self._lock:
+            for order in rows:
+                changed |= self._add(order)
+            if changed:
+                self.version += 1
+                self._snapshot = None
+            self._stats['refreshes'] += 1
+            self._stats['rows_read'] += len(rows)
+            self._stats['last_refresh_ms'] = (time.perf_counter() - started) * 1000
+
+    def _bootstrap(self, cur):
+        cur.execute("SELECT COALESCE(MAX(order_id), 0) FROM orders")
+        max_id = cur.fetchone()[0]
+        placeholders = ','.join(['%s'] * len(ACTIVE_STATUSES))
+        cur.execute(f"SELECT {_ORDER_COLUMNS} FROM orders WHERE status IN ({placeholders}) ORDER BY order_id",
+                    ACTIVE_STATUSES)
+        rows = self._with_items(cur, cur.fetchall())
+        with self._lock:
+            self._max_id = max_id
+        return rows
+
+    def _new_orders(self, cur):
+        rows = []
+        floor = max(0, self._max_id - REORDER_WINDOW)
+        while True:
+            cur.execute(f"SELECT {_ORDER_COLUMNS} FROM orders WHERE order_id > %s ORDER BY order_id LIMIT %s",
+                        (floor, self.batch_size))
+            batch = cur.fetchall()
+            rows.extend(r for r in batch if r[0] not in self._seen)
+            if len(batch) < self.batch_size:
+                break
+            floor = batch[-1][0]
+        return self._with_items(cur, rows)
+
+    def _with_items(self, cur, rows):
+        """Order dicts for `rows`, with their lines from order_items (or the legacy JSON)."""
+        active = [r[0] for r in rows if r[6] in ACTIVE_STATUSES]
+        lines = {}
+        for start in range(0, len(active), self.batch_size):
+            chunk = active[start:start + self.batch_size]
+            placeholders = ','.join(['%s'] * len(chunk))
+            cur.execute("SELECT order_id, item_id, name, quantity FROM order_items "
+                        f"WHERE order_id IN ({placeholders}) ORDER BY order_item_id", tuple(chunk))
+            for order_id, item_id, name, quantity in cur.fetchall():
+                lines.setdefault(order_id, []).append({'item_id': item_id, 'name': name, 'quantity': quantity})
+        return [{
+            'order_id': r[0],
+            'order_ref': r[1],
+            'name': r[2],
+            'address': r[3],
+            'payment': r[4],
+            'total': float(r[5]) if r[5] is not None else None,
+            'status': r[6] or 'pending',
+            'created_at': r[7].isoformat() if r[7] else None,
+            'items': lines.get(r[0]) or _legacy_items(r[8]),
+        } for r in rows]
+
+    # -- incremental updates (under _lock) -------------------------------
+
+    def _add(self, order):
+        order_id = order['order_id']
+        self._seen.add(order_id)
+        if order_id > self._max_id:
+            self._max_id = order_id
+            floor = self._max_id - REORDER_WINDOW
+            self._seen = {i for i in self._seen if i > floor}
+        if order['status'] not in ACTIVE_STATUSES or order_id in self._orders:
+            return False
+        self._orders[order_id] = order
+        if order['status'] in PREP_STATUSES:
+            self._count(order, 1)
+        return True
+
+    def _set_status(self, order_id, status):
+        order = self._orders.get(order_id)
+        if order is None or order['status'] == status:
+            # Orders not in the view yet are read with their current status
+            return False
+        was_prep = order['status'] in PREP_STATUSES
+        order['status'] = status
+        if was_prep and status not in PREP_STATUSES:
+            self._count(order, -1)
+        elif not was_prep and status in PREP_STATUSES:
+            self._count(order, 1)
+        if status not in ACTIVE_STATUSES:
+            del self._orders[order_id]
+        return True
+
+    def _count(self, order, sign):
+        for line in order['items']:
+            key = line['item_id'] if line['item_id'] is not None else line['name']
+            dish = self._dishes.get(key)
+            if dish is None:
+                dish = self._dishes[key] = {'item_id': line['item_id'], 'name': line['name'],
+                                            'quantity': 0, 'orders': 0}
+            dish['quantity'] += sign * line['quantity']
+            dish['orders'] += sign
+            if dish['quantity'] <= 0:
+                del self._dishes[key]
+
+    # -- reading (request threads) ---------------------------------------
+
+    def snapshot(self):
+        """The queue as a JSON-ready dict, rebuilt only when the view has changed."""
+        self.ensure_started()
+        with self._lock:
+            if self._snapshot is None:
+                orders = [dict(o, label=label(o['status'])) for _, o in sorted(self._orders.items())]
+                by_status = {status: 0 for status in ACTIVE_STATUSES}
+                for order in orders:
+                    by_status[order['status']] += 1
+                self._snapshot = {
+                    'version': self.version,
+                    'orders': orders,
+                    'prep_counts': sorted((dict(d) for d in self._dishes.values()),
+                                          key=lambda d: (-d['quantity'], d['name'] or '')),
+                    'by_status': by_status,
+                }
+            return self._snapshot
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, orders=len(self._orders), dishes=len(self._dishes), version=self.version)
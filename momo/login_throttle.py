@@ -0,0 +1,148 @@
+"""
+Login throttling with token buckets, keyed by client IP and by username.
+
+Every POST to /login costs one token from the client's IP bucket and one from
+the username's bucket *before* the user lookup and password hash, so
+scripted guessing against one account, or from one address, is capped at the
+configured rate however many workers it is spread over.
+
+Buckets refill continuously at `per_minute` tokens per minute up to `burst`.
+A bucket that has been idle long enough to refill completely carries no
+information, so it is simply forgotten; that keeps the memory store bounded
+by the number of recently active clients.
+
+  - MemoryBuckets: per-process dict, cheapest, but each gunicorn worker
+    counts separately.
+  - SQLiteBuckets: local WAL-mode file shared by all workers on the host.
+
+The IP bucket is only as good as `request.remote_addr`. Behind a proxy that
+is not configured as trusted (TRUSTED_PROXY_COUNT), every client shares the
+proxy's address and one bucket, so a few failed logins from anyone would
+throttle everyone; with `per_ip=False` only the username buckets apply.
+
+Username buckets are namespaced (`user:<name>` for customers, `staff:<name>`
+for the kitchen sign-in), so the staff sign-in never shares a bucket with a
+customer account of the same name.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from sqlite_util import ThreadLocalDB
+
+
+class MemoryBuckets:
+    def __init__(self, burst, per_minute, max_keys=100000):
+        self.burst = float(burst)
+        self.rate = float(per_minute) / 60.0
+        self.max_keys = int(max_keys)
+        self._buckets = OrderedDict()  # key -> (tokens, updated), least recently touched first
+        self._lock = threading.Lock()
+
+    def take(self, key, now=None):
+        """Consume one token for `key`; returns False when the bucket is empty."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            allowed = tokens >= 1.0
+            if allowed:
+                tokens -= 1.0
+            self._buckets[key] = (tokens, now)
+            self._evict(now)
+            return allowed
+
+    def _evict(self, now):
+        full_after = self.burst / self.rate if self.rate > 0 else float('inf')
+        while self._buckets:
+            key, (tokens, updated) = next(iter(self._buckets.items()))
+            if now - updated < full_after and len(self._buckets) <= self.max_keys:
+                break
+            del self._buckets[key]
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class SQLiteBuckets:
+    PURGE_EVERY = 1000
+
+    def __init__(self, path, burst, per_minute, table='login_buckets'):
+        self.burst = float(burst)
+        self.rate = float(per_minute) / 60.0
+        self.table = table
+        self._db = ThreadLocalDB(path)
+        self._ops = 0
+        self._db.get().execute(
+            f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)")
+
+    def take(self, key, now=None):
+        now = time.time() if now is None else now
+        conn = self._db.get()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(f"SELECT tokens, updated FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            tokens, updated = row if row else (self.burst, now)
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            allowed = tokens >= 1.0
+            if allowed:
+                tokens -= 1.0
+            conn.execute(f"INSERT OR REPLACE INTO {self.table} (key, tokens, updated) VALUES (?, ?, ?)",
+                         (key, tokens, now))
+            self._ops += 1
+            if self._ops % self.PURGE_EVERY == 0 and self.rate > 0:
+                conn.execute(f"DELETE FROM {self.table} WHERE updated < ?", (now - self.burst / self.rate,))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return allowed
+
+
+class LoginThrottle:
+    def __init__(self, ip_buckets, user_buckets, per_ip=True):
+        self.ip_buckets = ip_buckets
+        self.user_buckets = user_buckets
+        self.per_ip = bool(per_ip)
+        self._lock = threading.Lock()
+        self._counters = {'attempts': 0, 'allowed': 0, 'rejected_ip': 0, 'rejected_username': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def allow(self, ip, username, namespace='user'):
+        """Record a login attempt; returns False if it is over either limit."""
+        self._count('attempts')
+        if self.per_ip and not self.ip_buckets.take(f'ip:{ip}'):
+            self._count('rejected_ip')
+            return False
+        if username and not self.user_buckets.take(f'{namespace}:{username.strip().lower()}'):
+            self._count('rejected_username')
+            return False
+        self._count('allowed')
+        return True
+
+    def stats(self):
+        with self._lock:
+            data = dict(self._counters)
+        data['per_ip'] = self.per_ip
+        for name, buckets in (('tracked_ips', self.ip_buckets), ('tracked_usernames', self.user_buckets)):
+            if isinstance(buckets, MemoryBuckets):
+                data[name] = len(buckets)
+        return data
+
+
+def create_login_throttle(store='memory', path=None, ip_burst=20, ip_per_minute=10,
+                          user_burst=10, user_per_minute=5, per_ip=True):
+    store = (store or 'memory').lower()
+    if store == 'memory':
+        return LoginThrottle(MemoryBuckets(ip_burst, ip_per_minute), MemoryBuckets(user_burst, user_per_minute),
+                             per_ip)
+    if store == 'sqlite':
+        if not path:
+            raise ValueError('LOGIN_THROTTLE_STORE=sqlite requires LOGIN_THROTTLE_PATH')
+        return LoginThrottle(SQLiteBuckets(path, ip_burst, ip_per_minute, table='login_ip_buckets'),
+                             SQLiteBuckets(path, user_burst, user_per_minute, table='login_user_buckets'),
+                             per_ip)
+    raise ValueError(f'Unknown login throttle store: {store}')
@@ -0,0 +1,244 @@
+"""
+Menu search and filtering for /api/menu/search, built once from the catalog.
+
+Every index maps to a bitset (a Python int with bit N set for the N-th menu
+item), so combining filters is a handful of `&` operations however the query
+is composed:
+
+  - words: an inverted index from each word of the name, description,
+    categories and style to the items containing it. The words are also kept
+    sorted, so a prefix ("chee" -> cheese) is a bisect to the first match and
+    a walk over the adjacent words;
+  - facets: one bitset per category, style, veg/non-veg and spicy value;
+  - price: items sorted by price with cumulative bitsets, so a price range is
+    two bisects and one mask.
+
+Results are ranked by how many query words hit the item's name, then menu
+order (or sorted by price/name on request), and come with per-facet counts
+for the matching items. Serialised responses are kept in a small LRU keyed by
+the normalised query, so repeated searches skip even the bit arithmetic.
+"""
+import bisect
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict
+from decimal import Decimal, InvalidOperation
+
+_WORD_RE = re.compile(r'[a-z0-9]+')
+
+SORTS = ('relevance', 'price_asc', 'price_desc', 'name')
+
+MAX_QUERY_WORDS = 8
+
+
+class SearchError(ValueError):
+    """Raised for a malformed query parameter (reported to the client as a 400)."""
+
+
+def words(text):
+    return _WORD_RE.findall((text or '').lower())
+
+
+def _bits(mask):
+    """Positions of the set bits of `mask`, lowest first."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def _flag(value, name):
+    value = value.strip().lower()
+    if value in ('true', '1', 'yes'):
+        return True
+    if value in ('false', '0', 'no'):
+        return False
+    raise SearchError(f'{name} must be true or false')
+
+
+def _price(value, name):
+    try:
+        price = Decimal(value.strip())
+    except InvalidOperation:
+        raise SearchError(f'{name} must be a number')
+    if not price.is_finite() or price < 0:
+        raise SearchError(f'{name} must be a non-negative number')
+    return price
+
+
+class MenuSearch:
+    def __init__(self, catalog, cache_size=512):
+        self.items = tuple(catalog)
+        self._dicts = [item.to_dict() for item in self.items]
+        self.all = (1 << len(self.items)) - 1
+        self.cache_size = int(cache_size)
+
+        postings = {}
+        name_postings = {}
+        for pos, item in enumerate(self.items):
+            for word in set(words(item.name)):
+                name_postings[word] = name_postings.get(word, 0) | (1 << pos)
+            text = ' '.join((item.name, item.description, item.style, ' '.join(item.categories)))
+            for word in set(words(text)):
+                postings[word] = postings.get(word, 0) | (1 << pos)
+        self._postings = postings
+        self._name_postings = name_postings
+        self._terms = sorted(postings)
+
+        self._facets = {'category': {}, 'style': {}, 'veg': {}, 'spicy': {}}
+        for pos, item in enumerate(self.items):
+            bit = 1 << pos
+            for category in item.categories:
+                self._add_facet('category', category, bit)
+            if item.style:
+                self._add_facet('style', item.style, bit)
+            self._add_facet('veg', 'true' if item.veg else 'false', bit)
+            self._add_facet('spicy', 'true' if item.spicy else 'false', bit)
+
+        by_price = sorted(range(len(self.items)), key=lambda pos: (self.items[pos].price, pos))
+        self._prices = [self.items[pos].price for pos in by_price]
+        # _price_prefix[i]: the i cheapest items
+        self._price_prefix = [0]
+        for pos in by_price:
+            self._price_prefix.append(self._price_prefix[-1] | (1 << pos))
+        self._by_price = by_price
+
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'searches': 0, 'cache_hits': 0}
+
+    def _add_facet(self, facet, value, bit):
+        values = self._facets[facet]
+        values[value] = values.get(value, 0) | bit
+
+    # -- query parsing ---------------------------------------------------
+
+    def normalise(self, args):
+        """
+        Turn request args into a hashable, canonical query:
+            q, category, style (comma-separated or repeated), veg, spicy,
+            min_price, max_price, sort, limit
+        Raises SearchError for values that cannot be interpreted.
+        """
+        def multi(name):
+            values = set()
+            for raw in args.getlist(name):
+                values.update(v.strip().lower() for v in raw.split(',') if v.strip())
+            return tuple(sorted(values))
+
+        query_words = tuple(words(args.get('q', '')))
+        if len(query_words) > MAX_QUERY_WORDS:
+            raise SearchError(f'q may contain at most {MAX_QUERY_WORDS} words')
+        veg = _flag(args['veg'], 'veg') if args.get('veg') else None
+        spicy = _flag(args['spicy'], 'spicy') if args.get('spicy') else None
+        min_price = _price(args['min_price'], 'min_price') if args.get('min_price') else None
+        max_price = _price(args['max_price'], 'max_price') if args.get('max_price') else None
+        sort = (args.get('sort') or 'relevance').lower()
+        if sort not in SORTS:
+            raise SearchError(f"sort must be one of {', '.join(SORTS)}")
+        try:
+            limit = int(args.get('limit') or len(self.items))
+        except ValueError:
+            raise SearchError('limit must be an integer')
+        limit = max(0, min(limit, len(self.items)))
+        return (query_words, multi('category'), multi('style'), veg, spicy, min_price, max_price, sort, limit)
+
+    # -- matching --------------------------------------------------------
+
+    def _terms_with_prefix(self, word):
+        start = bisect.bisect_left(self._terms, word)
+        for term in self._terms[start:]:
+            if not term.startswith(word):
+                break
+            yield term
+
+    def _word_mask(self, word, postings=None):
+        """Items with a word starting with `word` (in `postings`, by default anywhere)."""
+        postings = self._postings if postings is None else postings
+        mask = 0
+        for term in self._terms_with_prefix(word):
+            mask |= postings.get(term, 0)
+        return mask
+
+    def _price_mask(self, min_price, max_price):
+        lo = 0 if min_price is None else bisect.bisect_left(self._prices, min_price)
+        hi = len(self._prices) if max_price is None else bisect.bisect_right(self._prices, max_price)
+        if hi <= lo:
+            return 0
+        return self._price_prefix[hi] & ~self._price_prefix[lo]
+
+    def match(self, query):
+        """Bitset of the items matching a normalised `query`."""
+        query_words, categories, styles, veg, spicy, min_price, max_price, _, _ = query
+        mask = self.all
+        for word in query_words:
+            mask &= self._word_mask(word)
+        # Values within a facet are alternatives (OR); facets narrow each other (AND)
+        for facet, values in (('category', categories), ('style', styles)):
+            if values:
+                allowed = 0
+                for value in values:
+                    allowed |= self._facets[facet].get(value, 0)
+                mask &= allowed
+        if veg is not None:
+            mask &= self._facets['veg'].get('true' if veg else 'false', 0)
+        if spicy is not None:
+            mask &= self._facets['spicy'].get('true' if spicy else 'false', 0)
+        if min_price is not None or max_price is not None:
+            mask &= self._price_mask(min_price, max_price)
+        return mask
+
+    def _order(self, mask, query):
+        query_words, sort = query[0], query[7]
+        if sort in ('price_asc', 'price_desc'):
+            positions = [pos for pos in self._by_price if mask >> pos & 1]
+            return positions[::-1] if sort == 'price_desc' else positions
+        positions = list(_bits(mask))
+        if sort == 'name':
+            return sorted(positions, key=lambda pos: self.items[pos].name.lower())
+        if query_words:
+            # Items whose name matches more of the query words first (the sort is stable)
+            name_masks = [self._word_mask(word, self._name_postings) for word in query_words]
+            positions.sort(key=lambda pos: -sum(m >> pos & 1 for m in name_masks))
+        return positions
+
+    def _facet_counts(self, mask):
+        return {facet: {value: (mask & bits).bit_count() for value, bits in sorted(values.items())}
+                for facet, values in self._facets.items()}
+
+    # -- responses -------------------------------------------------------
+
+    def search(self, args):
+        """(JSON body bytes, etag) for the request args, from the cache when possible."""
+        query = self.normalise(args)
+        with self._lock:
+            self._stats['searches'] += 1
+            entry = self._cache.get(query)
+            if entry is not None:
+                self._cache.move_to_end(query)
+                self._stats['cache_hits'] += 1
+                return entry
+
+        mask = self.match(query)
+        positions = self._order(mask, query)
+        prices = [self.items[pos].price for pos in positions]
+        body = json.dumps({
+            'total': len(positions),
+            'items': [self._dicts[pos] for pos in positions[:query[8]]],
+            'facets': self._facet_counts(mask),
+            'price': {'min': float(min(prices)), 'max': float(max(prices))} if prices else None,
+        }, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        entry = (body, hashlib.sha256(body).hexdigest()[:32])
+
+        if self.cache_size > 0:
+            with self._lock:
+                self._cache[query] = entry
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return entry
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, cached=len(self._cache), items=len(self.items), terms=len(self._terms))
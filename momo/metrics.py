@@ -0,0 +1,353 @@
+"""
+Request and query metrics in the Prometheus text exposition format.
+
+Recording is a dict update under one lock per observation; nothing is
+formatted or written on the request path. Each process keeps its own
+counters, gauges and histograms:
+
+  - MemoryMetricsStore: /metrics reports the scraped process only. Fine for
+    a single worker.
+  - SQLiteMetricsStore: every worker flushes a snapshot of its series to a
+    local WAL-mode file from a background thread (and once more on exit);
+    /metrics sums the snapshots of all workers on the host. The counters and
+    histograms of a worker that has exited are folded into one retained
+    `pid = 0` row per series, so totals never go backwards and dead workers
+    leave no rows behind; their gauges are dropped. Snapshots are keyed by a
+    per-process instance id, not just the pid, so a new worker that reuses a
+    dead worker's pid does not overwrite what the dead one counted.
+
+Components with their own stats (connection pool, order queue, ...) are
+folded in through collectors, callables returning {stat: number} that are
+exported as one gauge family each with a `stat` label.
+"""
+import atexit
+import bisect
+import os
+import threading
+import time
+import uuid
+
+from sqlite_util import ThreadLocalDB
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(pairs):
+    return ','.join(f'{k}="{_escape(v)}"' for k, v in pairs)
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class MemoryMetricsStore:
+    """No sharing: the scraped process reports only its own samples."""
+
+    def __init__(self):
+        self._samples = []
+
+    def write(self, pid, samples, instance=None):
+        self._samples = list(samples)
+
+    def read(self):
+        return list(self._samples)
+
+
+class SQLiteMetricsStore:
+    RETAINED = ''  # instance of the pid = 0 rows holding what exited workers counted
+
+    def __init__(self, path):
+        self._db = ThreadLocalDB(path)
+        self._db.get().execute('''
+            CREATE TABLE IF NOT EXISTS metric_series (
+                instance TEXT NOT NULL,
+                pid INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                labels TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                value REAL NOT NULL,
+                PRIMARY KEY (instance, name, labels)
+            )
+        ''')
+
+    def write(self, pid, samples, instance=None):
+        instance = instance or str(pid)
+        conn = self._db.get()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            self._retire_dead(conn, pid, instance)
+            conn.execute("DELETE FROM metric_series WHERE instance = ?", (instance,))
+            conn.executemany(
+                "INSERT INTO metric_series (instance, pid, name, labels, kind, value) VALUES (?, ?, ?, ?, ?, ?)",
+                [(instance, pid, name, labels, kind, value) for name, labels, kind, value in samples])
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def read(self):
+        conn = self._db.get()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            self._retire_dead(conn)
+            rows = conn.execute("SELECT name, labels, kind, value FROM metric_series").fetchall()
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return rows
+
+    def _retire_dead(self, conn, pid=None, instance=None):
+        """
+        Fold the counters and histograms of exited workers into the retained
+        pid = 0 rows and delete their snapshots. An instance holding the
+        caller's own pid is a dead predecessor whose pid was reused.
+        """
+        instances = conn.execute("SELECT DISTINCT instance, pid FROM metric_series WHERE instance != ?",
+                                 (self.RETAINED,)).fetchall()
+        dead = [i for i, p in instances
+                if i != instance and ((pid is not None and p == pid) or not _pid_alive(p))]
+        if not dead:
+            return
+        placeholders = ','.join(['?'] * len(dead))
+        conn.execute(
+            "INSERT INTO metric_series (instance, pid, name, labels, kind, value) "
+            f"SELECT ?, 0, name, labels, kind, SUM(value) FROM metric_series "
+            f"WHERE instance IN ({placeholders}) AND kind != 'gauge' GROUP BY name, labels, kind "
+            "ON CONFLICT (instance, name, labels) DO UPDATE SET value = value + excluded.value",
+            (self.RETAINED, *dead))
+        conn.execute(f"DELETE FROM metric_series WHERE instance IN ({placeholders})", dead)
+
+
+class Metrics:
+    def __init__(self, store=None, flush_interval=5.0, buckets=DEFAULT_BUCKETS):
+        self.store = store or MemoryMetricsStore()
+        self.flush_interval = float(flush_interval)
+        self.buckets = tuple(sorted(buckets))
+        self._families = {}    # name -> (type, help)
+        self._counters = {}    # (name, label pairs) -> value
+        self._gauges = {}
+        self._histograms = {}  # (name, label pairs) -> [per-bucket counts..., +Inf count, sum]
+        self._collectors = []
+        self._lock = threading.Lock()
+        self._pid = None
+        self._instance = uuid.uuid4().hex  # tells this process apart from an earlier one with the same pid
+        self._stop = threading.Event()
+
+    # -- declaration ---------------------------------------------------------
+
+    def counter(self, name, help_text):
+        self._families[name] = ('counter', help_text)
+
+    def gauge(self, name, help_text):
+        self._families[name] = ('gauge', help_text)
+
+    def histogram(self, name, help_text):
+        self._families[name] = ('histogram', help_text)
+
+    def register_collector(self, name, help_text, collect):
+        """Export `collect()` -> {stat: number} as gauge `name{stat="..."}` at every flush."""
+        self.gauge(name, help_text)
+        self._collectors.append((name, collect))
+
+    # -- recording (hot path) ------------------------------------------------
+
+    def inc(self, name, labels=(), amount=1):
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def add(self, name, labels=(), amount=1):
+        key = (name, labels)
+        with self._lock:
+            self._gauges[key] = self._gauges.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        index = bisect.bisect_left(self.buckets, value)
+        key = (name, labels)
+        with self._lock:
+            series = self._histograms.get(key)
+            if series is None:
+                series = self._histograms[key] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    # -- export --------------------------------------------------------------
+
+    def samples(self):
+        """Flatten this process's series into (sample name, label string, kind, value)."""
+        with self._lock:
+            counters = list(self._counters.items())
+            gauges = list(self._gauges.items())
+            histograms = [(key, list(series)) for key, series in self._histograms.items()]
+
+        out = []
+        for (name, labels), value in counters:
+            out.append((name, _labels(labels), 'counter', value))
+        for (name, labels), value in gauges:
+            out.append((name, _labels(labels), 'gauge', value))
+        for (name, labels), series in histograms:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series[:-1]):
+                cumulative += count
+                out.append((f'{name}_bucket', _labels(labels + (('le', _number(bound)),)), 'histogram', cumulative))
+            out.append((f'{name}_count', _labels(labels), 'histogram', cumulative))
+            out.append((f'{name}_sum', _labels(labels), 'histogram', series[-1]))
+        for name, collect in self._collectors:
+            try:
+                stats = collect() or {}
+            except Exception as e:
+                print(f"WARNING: metrics collector {name} failed: {e}")
+                continue
+            for stat, value in stats.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    out.append((name, _labels((('stat', stat),)), 'gauge', value))
+        return out
+
+    def flush(self):
+        try:
+            self.store.write(os.getpid(), self.samples(), self._instance)
+        except Exception as e:
+            print(f"WARNING: failed to flush metrics: {e}")
+
+    def render(self):
+        """Prometheus text format, summed over every process that flushed to the store."""
+        self.flush()
+        totals = {}
+        for name, labels, kind, value in self.store.read():
+            totals[(name, labels)] = totals.get((name, labels), 0) + value
+
+        by_family = {}
+        for (name, labels), value in totals.items():
+            family = name
+            for suffix in ('_bucket', '_count', '_sum'):
+                base = name[:-len(suffix)]
+                if name.endswith(suffix) and self._families.get(base, ('',))[0] == 'histogram':
+                    family = base
+                    break
+            by_family.setdefault(family, []).append((name, labels, value))
+
+        lines = []
+        for family in sorted(by_family):
+            kind, help_text = self._families.get(family, ('untyped', ''))
+            lines.append(f'# HELP {family} {help_text}')
+            lines.append(f'# TYPE {family} {kind}')
+            for name, labels, value in sorted(by_family[family], key=_sample_order):
+                lines.append(f'{name}{{{labels}}} {_number(value)}' if labels else f'{name} {_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+    # -- background flushing -------------------------------------------------
+
+    def ensure_started(self):
+        """Start the flusher in this process; after a fork, drop the parent's samples first."""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            if self._pid is not None:
+                self._counters.clear()
+                self._gauges.clear()
+                self._histograms.clear()
+                self._instance = uuid.uuid4().hex
+            self._pid = pid
+        if isinstance(self.store, MemoryMetricsStore):
+            return
+        thread = threading.Thread(target=self._run, name='metrics-flusher', daemon=True)
+        thread.start()
+        atexit.register(self.flush)
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+
+def _sample_order(sample):
+    # Keep histogram buckets in bound order rather than string order
+    name, labels, _ = sample
+    le = labels.rsplit('le="', 1)[1].rstrip('"') if 'le="' in labels else None
+    bound = float('inf') if le == '+Inf' else float(le) if le is not None else 0.0
+    return (name, labels.rsplit('le="', 1)[0], bound)
+
+
+class TimedCursor:
+    """Cursor proxy that records the duration of every execute() in `metrics`."""
+
+    def __init__(self, cursor, metrics, name='momo_db_query_duration_seconds'):
+        self._cursor = cursor
+        self._metrics = metrics
+        self._name = name
+
+    def _timed(self, method, operation, *args, **kwargs):
+        verb = operation.lstrip().split(None, 1)[0].lower() if operation and operation.strip() else 'unknown'
+        started = time.perf_counter()
+        try:
+            return method(operation, *args, **kwargs)
+        finally:
+            self._metrics.observe(self._name, (('operation', verb),), time.perf_counter() - started)
+
+    def execute(self, operation, *args, **kwargs):
+        return self._timed(self._cursor.execute, operation, *args, **kwargs)
+
+    def executemany(self, operation, *args, **kwargs):
+        return self._timed(self._cursor.executemany, operation, *args, **kwargs)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._cursor.close()
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class TimedConnection:
+    """Connection proxy whose cursors are TimedCursors, for code that takes a connection."""
+
+    def __init__(self, conn, metrics):
+        self._conn = conn
+        self._metrics = metrics
+
+    def cursor(self, *args, **kwargs):
+        return TimedCursor(self._conn.cursor(*args, **kwargs), self._metrics)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def create_metrics(store='memory', path=None, flush_interval=5.0):
+    store = (store or 'memory').lower()
+    if store == 'off':
+        return None
+    if store == 'memory':
+        return Metrics(MemoryMetricsStore(), flush_interval)
+    if store == 'sqlite':
+        if not path:
+            raise ValueError('METRICS_STORE=sqlite requires METRICS_PATH')
+        return Metrics(SQLiteMetricsStore(path), flush_interval)
+    raise ValueError(f'Unknown metrics store: {store}')
@@ -0,0 +1,212 @@
+"""
+Versioned schema migrations.
+
+Each migration is a module in this package named `v<NNN>_<description>.py`
+that defines `upgrade(schema)`, where `schema` is a `SchemaEditor` bound to an
+open connection. Migrations are applied in version order and recorded in the
+`schema_version` table, so each one runs exactly once per database.
+
+MySQL commits DDL implicitly, so a migration that fails half-way cannot be
+rolled back; write migrations with the idempotent helpers on `SchemaEditor`
+(`add_column`, `add_index`, ...) so a re-run after a failure is safe.
+
+Migrations are written in MySQL's dialect. On the embedded SQLite backend
+(DATABASE_URL=sqlite:///...) `SchemaEditor` rewrites the few constructs that
+differ: AUTO_INCREMENT keys, catalog lookups (sqlite_master / PRAGMA instead
+of information_schema), column renames and the migration lock.
+
+Run them with `flask --app app migrate`, by visiting /init-db (INIT_DB=true),
+or automatically at startup with MIGRATE_ON_STARTUP=true. The deploy configs
+run `flask --app app migrate` before starting a release (render.yaml's
+preDeployCommand, the Docker entrypoint); an app process that still finds
+migrations pending refuses database requests until they are applied.
+"""
+import importlib
+import pkgutil
+import re
+import time
+import uuid
+
+from db_sqlite import dialect
+
+_MODULE_RE = re.compile(r'^v(\d+)_\w+$')
+_LOCK_NAME = 'momo_schema_migrations'
+
+# MySQL DDL -> SQLite DDL
+_SQLITE_DDL = (
+    (re.compile(r'\bINT\s+PRIMARY\s+KEY\s+AUTO_INCREMENT\b', re.I), 'INTEGER PRIMARY KEY AUTOINCREMENT'),
+)
+
+
+class SchemaEditor:
+    """Thin helper around a connection for writing re-runnable migrations."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.dialect = dialect(conn)
+
+    def _ddl(self, sql):
+        if self.dialect == 'sqlite':
+            for pattern, replacement in _SQLITE_DDL:
+                sql = pattern.sub(replacement, sql)
+        return sql
+
+    def execute(self, sql, params=None):
+        cur = self.conn.cursor()
+        try:
+            cur.execute(self._ddl(sql), params or ())
+            if cur.description:
+                cur.fetchall()
+        finally:
+            cur.close()
+
+    def scalar(self, sql, params):
+        cur = self.conn.cursor()
+        try:
+            cur.execute(sql, params)
+            row = cur.fetchone()
+            return row[0] if row else None
+        finally:
+            cur.close()
+
+    def table_exists(self, table):
+        if self.dialect == 'sqlite':
+            return bool(self.scalar(
+                "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = %s", (table,)))
+        return bool(self.scalar(
+            "SELECT COUNT(*) FROM information_schema.tables "
+            "WHERE table_schema = DATABASE() AND table_name = %s", (table,)))
+
+    def column_exists(self, table, column):
+        if self.dialect == 'sqlite':
+            return bool(self.scalar(
+                "SELECT COUNT(*) FROM pragma_table_info(%s) WHERE name = %s", (table, column)))
+        return bool(self.scalar(
+            "SELECT COUNT(*) FROM information_schema.columns "
+            "WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s", (table, column)))
+
+    def index_exists(self, table, index):
+        if self.dialect == 'sqlite':
+            return bool(self.scalar(
+                "SELECT COUNT(*) FROM sqlite_master WHERE type = 'index' AND tbl_name = %s AND name = %s",
+                (table, index)))
+        return bool(self.scalar(
+            "SELECT COUNT(*) FROM information_schema.statistics "
+            "WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s", (table, index)))
+
+    def add_column(self, table, column, definition):
+        """ALTER TABLE ... ADD COLUMN, skipped when the column already exists."""
+        if not self.column_exists(table, column):
+            self.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+    def rename_column(self, table, old, new, definition):
+        """Rename `old` to `new` (MySQL also needs the full column `definition`)."""
+        if self.dialect == 'sqlite':
+            self.execute(f"ALTER TABLE {table} RENAME COLUMN {old} TO {new}")
+        else:
+            self.execute(f"ALTER TABLE {table} CHANGE {old} {new} {definition}")
+
+    def add_index(self, table, index, columns, unique=False):
+        """CREATE [UNIQUE] INDEX, skipped when an index with that name already exists."""
+        if not self.index_exists(table, index):
+            kind = 'UNIQUE INDEX' if unique else 'INDEX'
+            self.execute(f"CREATE {kind} {index} ON {table} ({columns})")
+
+    def acquire_lock(self, name, timeout):
+        """
+        Take a named lock shared by every connection to this database. MySQL has
+        GET_LOCK; on SQLite a row in `schema_lock` plays the same role (a lock
+        older than ten minutes is assumed to belong to a crashed runner).
+        """
+        if self.dialect != 'sqlite':
+            return bool(self.scalar("SELECT GET_LOCK(%s, %s)", (name, timeout)))
+        self.execute("CREATE TABLE IF NOT EXISTS schema_lock (name VARCHAR(255) PRIMARY KEY, "
+                     "holder VARCHAR(64) NOT NULL, acquired_at REAL NOT NULL)")
+        self.conn.commit()
+        self._lock_holder = uuid.uuid4().hex
+        deadline = time.time() + timeout
+        while True:
+            self.execute("DELETE FROM schema_lock WHERE name = %s AND acquired_at < %s", (name, time.time() - 600))
+            self.execute("INSERT OR IGNORE INTO schema_lock (name, holder, acquired_at) VALUES (%s, %s, %s)",
+                         (name, self._lock_holder, time.time()))
+            self.conn.commit()
+            if self.scalar("SELECT holder FROM schema_lock WHERE name = %s", (name,)) == self._lock_holder:
+                return True
+            if time.time() >= deadline:
+                return False
+            time.sleep(0.2)
+
+    def release_lock(self, name):
+        if self.dialect != 'sqlite':
+            self.scalar("SELECT RELEASE_LOCK(%s)", (name,))
+            return
+        self.execute("DELETE FROM schema_lock WHERE name = %s AND holder = %s", (name, self._lock_holder))
+        self.conn.commit()
+
+
+def discover():
+    """Return (version, name, module) for every migration module, in version order."""
+    found = []
+    for info in pkgutil.iter_modules(__path__):
+        match = _MODULE_RE.match(info.name)
+        if not match:
+            continue
+        module = importlib.import_module(f'{__name__}.{info.name}')
+        found.append((int(match.group(1)), info.name, module))
+    found.sort(key=lambda m: m[0])
+    return found
+
+
+def applied_versions(conn):
+    schema = SchemaEditor(conn)
+    if not schema.table_exists('schema_version'):
+        return set()
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT version FROM schema_version")
+        return {row[0] for row in cur.fetchall()}
+    finally:
+        cur.close()
+
+
+def pending_migrations(conn):
+    """Names of the migrations not yet applied to `conn`'s database, in version order."""
+    done = applied_versions(conn)
+    return [name for version, name, _ in discover() if version not in done]
+
+
+def run_migrations(conn, log=print):
+    """
+    Apply all pending migrations on `conn` and return the list of versions applied.
+
+    A named lock serialises concurrent runners (e.g. several gunicorn workers
+    starting with MIGRATE_ON_STARTUP=true).
+    """
+    schema = SchemaEditor(conn)
+    schema.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INT PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    if not schema.acquire_lock(_LOCK_NAME, 60):
+        raise RuntimeError('Timed out waiting for another migration run to finish')
+
+    applied = []
+    try:
+        done = applied_versions(conn)
+        for version, name, module in discover():
+            if version in done:
+                continue
+            log(f"[DB] Applying migration {name}")
+            module.upgrade(schema)
+            schema.execute("INSERT INTO schema_version (version, name) VALUES (%s, %s)", (version, name))
+            conn.commit()
+            applied.append(version)
+    finally:
+        schema.release_lock(_LOCK_NAME)
+
+    if not applied:
+        log("[DB] Schema is up to date")
+    return applied
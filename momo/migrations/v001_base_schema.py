@@ -0,0 +1,58 @@
+"""
+Base schema for users, contacts and orders.
+
+Reconciles the table definitions that used to be scattered across
+`init_db()`, `checkout()` and `contact_submit()`:
+  - users: the application reads/writes `password` (init_db used to create
+    `password_hash`) and stores a saved delivery `address`.
+  - orders: union of the checkout columns (name, email, address, payment)
+    and the init_db `status` column.
+Databases created by either of the old code paths are upgraded in place.
+"""
+
+
+def upgrade(schema):
+    schema.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INT PRIMARY KEY AUTO_INCREMENT,
+            username VARCHAR(80) NOT NULL UNIQUE,
+            email VARCHAR(255) UNIQUE,
+            password VARCHAR(255) NOT NULL,
+            address TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    if schema.column_exists('users', 'password_hash') and not schema.column_exists('users', 'password'):
+        schema.rename_column('users', 'password_hash', 'password', 'VARCHAR(255) NOT NULL')
+    schema.add_column('users', 'address', 'TEXT')
+
+    schema.execute('''
+        CREATE TABLE IF NOT EXISTS contacts (
+            contact_id INT PRIMARY KEY AUTO_INCREMENT,
+            name VARCHAR(255),
+            email VARCHAR(255),
+            subject VARCHAR(255),
+            message TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    schema.execute('''
+        CREATE TABLE IF NOT EXISTS orders (
+            order_id INT PRIMARY KEY AUTO_INCREMENT,
+            user_id INT NULL,
+            name VARCHAR(255),
+            email VARCHAR(255),
+            total DECIMAL(10,2),
+            address TEXT,
+            items TEXT,
+            payment VARCHAR(32),
+            status VARCHAR(32) NOT NULL DEFAULT 'pending',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    schema.add_column('orders', 'name', 'VARCHAR(255)')
+    schema.add_column('orders', 'email', 'VARCHAR(255)')
+    schema.add_column('orders', 'address', 'TEXT')
+    schema.add_column('orders', 'payment', 'VARCHAR(32)')
+    schema.add_column('orders', 'status', "VARCHAR(32) NOT NULL DEFAULT 'pending'")
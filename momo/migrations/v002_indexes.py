@@ -0,0 +1,11 @@
+"""
+Indexes for the hot read paths.
+
+  - orders (user_id, created_at): a customer's order history, newest first.
+  - orders (created_at): date-range scans for reporting.
+"""
+
+
+def upgrade(schema):
+    schema.add_index('orders', 'idx_orders_user_created', 'user_id, created_at')
+    schema.add_index('orders', 'idx_orders_created', 'created_at')
@@ -0,0 +1,71 @@
+"""
+Normalised order lines.
+
+Adds `order_items` (one row per dish per order) so item-level reporting can
+run as indexed SQL aggregates, and backfills it from the JSON `orders.items`
+column written by earlier versions of checkout().
+"""
+import json
+from decimal import Decimal, InvalidOperation
+
+BACKFILL_BATCH = 500
+
+
+def _lines(order_id, raw):
+    try:
+        items = json.loads(raw) if raw else []
+    except ValueError:
+        return []
+    lines = []
+    for item in items if isinstance(items, list) else []:
+        if not isinstance(item, dict):
+            continue
+        try:
+            price = Decimal(str(item.get('price', 0)))
+            quantity = int(item.get('quantity', 1))
+        except (InvalidOperation, TypeError, ValueError):
+            continue
+        lines.append((order_id, str(item.get('id', ''))[:64], str(item.get('name', ''))[:255], price, quantity))
+    return lines
+
+
+def upgrade(schema):
+    schema.execute('''
+        CREATE TABLE IF NOT EXISTS order_items (
+            order_item_id INT PRIMARY KEY AUTO_INCREMENT,
+            order_id INT NOT NULL,
+            item_id VARCHAR(64) NOT NULL,
+            name VARCHAR(255) NOT NULL,
+            unit_price DECIMAL(10,2) NOT NULL,
+            quantity INT NOT NULL
+        )
+    ''')
+    schema.add_index('order_items', 'idx_order_items_order', 'order_id')
+    schema.add_index('order_items', 'idx_order_items_item', 'item_id')
+
+    # Backfill from the legacy JSON column for orders that have no lines yet
+    cur = schema.conn.cursor()
+    try:
+        cur.execute('''
+            SELECT o.order_id, o.items FROM orders o
+            WHERE o.items IS NOT NULL
+              AND NOT EXISTS (SELECT 1 FROM order_items oi WHERE oi.order_id = o.order_id)
+        ''')
+        rows = cur.fetchall()
+    finally:
+        cur.close()
+
+    batch = []
+    ins = schema.conn.cursor()
+    try:
+        for order_id, raw in rows:
+            batch.extend(_lines(order_id, raw))
+            if len(batch) >= BACKFILL_BATCH:
+                ins.executemany("INSERT INTO order_items (order_id, item_id, name, unit_price, quantity) "
+                                "VALUES (%s, %s, %s, %s, %s)", batch)
+                batch = []
+        if batch:
+            ins.executemany("INSERT INTO order_items (order_id, item_id, name, unit_price, quantity) "
+                            "VALUES (%s, %s, %s, %s, %s)", batch)
+    finally:
+        ins.close()
@@ -0,0 +1,12 @@
+"""
+Client-visible order reference.
+
+`orders.order_ref` is generated at checkout (before the row exists, so the
+write-behind queue can confirm an order immediately) and is unique, which
+lets a replayed queue entry be detected and skipped.
+"""
+
+
+def upgrade(schema):
+    schema.add_column('orders', 'order_ref', 'VARCHAR(32) NULL')
+    schema.add_index('orders', 'uq_orders_order_ref', 'order_ref', unique=True)
@@ -0,0 +1,19 @@
+"""
+Order status history.
+
+Every status change appends a row to `order_status_events`. Its event_id is
+the watermark the live-update watcher (order_status.py) polls past, so the
+per-tick query is a primary-key range scan however many orders exist.
+"""
+
+
+def upgrade(schema):
+    schema.execute('''
+        CREATE TABLE IF NOT EXISTS order_status_events (
+            event_id INT PRIMARY KEY AUTO_INCREMENT,
+            order_id INT NOT NULL,
+            status VARCHAR(32) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    schema.add_index('order_status_events', 'idx_order_status_events_order', 'order_id, event_id')
@@ -0,0 +1,11 @@
+"""
+Index for loading the kitchen queue.
+
+Each worker loads the unfinished orders once (kitchen_view.py) and then
+follows new orders by id, so this only serves that first `status IN (...)`
+lookup -- but without it that lookup scans every order ever placed.
+"""
+
+
+def upgrade(schema):
+    schema.add_index('orders', 'idx_orders_status', 'status, order_id')
@@ -0,0 +1,324 @@
+"""
+Write-behind order persistence (ORDER_WRITE_MODE=write_behind).
+
+checkout() validates the order, appends it to a durable local spool (a
+WAL-mode SQLite file) and renders the confirmation straight away using the
+order reference. A background writer thread drains the spool into MySQL in
+batches, inserting each batch in a single transaction (group commit), and
+only deletes spool entries once that transaction has committed.
+
+  - Durability: an order is on disk in the spool before the customer sees the
+    confirmation; entries left behind by a crash or restart are drained by
+    the next writer. Replays are detected through the unique order_ref.
+  - Back-pressure: `submit()` raises QueueFull once `max_pending` orders are
+    waiting, so the caller can fall back to a synchronous write instead of
+    letting the spool grow without bound while the database is down.
+  - Several gunicorn workers can share one spool: entries are claimed before
+    they are written, and stale claims (a writer that died mid-batch) are
+    taken over after CLAIM_TIMEOUT seconds.
+  - Poison orders: when a batch fails, its orders are retried one at a time,
+    so one order the database rejects cannot hold up the rest. An order that
+    fails `max_attempts` times is moved to the `order_spool_dead` table of the
+    spool for an operator to inspect. Failures while the database is
+    unreachable do not count as attempts.
+  - `stop()` (registered with atexit by the app) flushes what it can on
+    shutdown.
+"""
+import json
+import os
+import threading
+import time
+import uuid
+
+from orders import insert_orders
+from sqlite_util import ThreadLocalDB
+
+
+def _connected(conn):
+    """False once the server connection is known to be gone (drivers without a check count as up)."""
+    try:
+        is_connected = getattr(conn, 'is_connected', None)
+        return is_connected is None or bool(is_connected())
+    except Exception:
+        return False
+
+
+class QueueFull(Exception):
+    """Raised by `submit()` when the spool already holds `max_pending` orders."""
+
+
+class OrderSpool:
+    CLAIM_TIMEOUT = 60.0
+
+    def __init__(self, path):
+        self._db = ThreadLocalDB(path)
+        self._db.get().execute('''
+            CREATE TABLE IF NOT EXISTS order_spool (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                order_ref TEXT NOT NULL UNIQUE,
+                payload TEXT NOT NULL,
+                enqueued_at REAL NOT NULL,
+                claimed_by TEXT,
+                claimed_at REAL,
+                attempts INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        self._db.get().execute('''
+            CREATE TABLE IF NOT EXISTS order_spool_dead (
+                seq INTEGER PRIMARY KEY,
+                order_ref TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                enqueued_at REAL NOT NULL,
+                failed_at REAL NOT NULL,
+                attempts INTEGER NOT NULL,
+                error TEXT
+            )
+        ''')
+
+    def enqueue(self, order, max_pending):
+        conn = self._db.get()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            (pending,) = conn.execute("SELECT COUNT(*) FROM order_spool").fetchone()
+            if pending >= max_pending:
+                raise QueueFull(f'{pending} orders already waiting to be written')
+            conn.execute("INSERT INTO order_spool (order_ref, payload, enqueued_at) VALUES (?, ?, ?)",
+                         (order['order_ref'], json.dumps(order, default=str), time.time()))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def claim(self, owner, limit):
+        """Claim up to `limit` unclaimed (or stale) entries; returns [(seq, order), ...]."""
+        conn = self._db.get()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            rows = conn.execute(
+                "SELECT seq, payload FROM order_spool "
+                "WHERE claimed_by IS NULL OR claimed_at < ? ORDER BY seq LIMIT ?",
+                (now - self.CLAIM_TIMEOUT, limit)).fetchall()
+            if rows:
+                conn.executemany("UPDATE order_spool SET claimed_by = ?, claimed_at = ? WHERE seq = ?",
+                                 [(owner, now, seq) for seq, _ in rows])
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return [(seq, json.loads(payload)) for seq, payload in rows]
+
+    def ack(self, seqs):
+        self._db.get().executemany("DELETE FROM order_spool WHERE seq = ?", [(seq,) for seq in seqs])
+
+    def unclaim(self, seqs):
+        """Release entries that could not be written for reasons of their own (no attempt counted)."""
+        self._db.get().executemany("UPDATE order_spool SET claimed_by = NULL, claimed_at = NULL WHERE seq = ?",
+                                   [(seq,) for seq in seqs])
+
+    def fail(self, seq, error, max_attempts):
+        """
+        Record a failed write of entry `seq`. Returns True if it has now failed
+        `max_attempts` times and was moved to the dead-letter table.
+        """
+        conn = self._db.get()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute("UPDATE order_spool SET claimed_by = NULL, claimed_at = NULL, attempts = attempts + 1 "
+                         "WHERE seq = ?", (seq,))
+            row = conn.execute("SELECT attempts FROM order_spool WHERE seq = ?", (seq,)).fetchone()
+            dead = row is not None and row[0] >= max_attempts
+            if dead:
+                conn.execute("INSERT OR REPLACE INTO order_spool_dead "
+                             "(seq, order_ref, payload, enqueued_at, failed_at, attempts, error) "
+                             "SELECT seq, order_ref, payload, enqueued_at, ?, attempts, ? "
+                             "FROM order_spool WHERE seq = ?", (time.time(), str(error)[:1000], seq))
+                conn.execute("DELETE FROM order_spool WHERE seq = ?", (seq,))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return dead
+
+    def pending(self):
+        (count,) = self._db.get().execute("SELECT COUNT(*) FROM order_spool").fetchone()
+        return count
+
+    def dead(self):
+        (count,) = self._db.get().execute("SELECT COUNT(*) FROM order_spool_dead").fetchone()
+        return count
+
+
+class OrderQueue:
+    def __init__(self, spool_path, pool, max_pending=1000, batch_size=50, interval=0.5, group_delay=0.05,
+                 on_written=None, max_attempts=5):
+        """
+        spool_path:  SQLite file holding queued orders
+        pool:        ConnectionPool used by the writer thread
+        max_pending: back-pressure limit for submit()
+        batch_size:  maximum orders written per transaction
+        interval:    seconds the writer sleeps when idle (also its retry base delay)
+        group_delay: seconds the writer waits after a wake-up so concurrent
+                     checkouts land in the same commit
+        on_written:  optional callable given the list of orders of each committed batch
+        max_attempts: failed writes after which an order is moved to the dead-letter table
+        """
+        self.spool = OrderSpool(spool_path)
+        self.pool = pool
+        self.max_pending = int(max_pending)
+        self.batch_size = int(batch_size)
+        self.interval = float(interval)
+        self.group_delay = float(group_delay)
+        self.on_written = on_written
+        self.max_attempts = max(1, int(max_attempts))
+
+        self._owner = uuid.uuid4().hex
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._stats_lock = threading.Lock()
+        self._stats = {'submitted': 0, 'rejected': 0, 'written': 0, 'batches': 0, 'failed_batches': 0,
+                       'failed_orders': 0, 'dead_lettered': 0}
+
+    def _count(self, **deltas):
+        with self._stats_lock:
+            for key, delta in deltas.items():
+                self._stats[key] += delta
+
+    def submit(self, order):
+        """Durably queue `order` (raises QueueFull past the back-pressure limit)."""
+        self.start()
+        try:
+            self.spool.enqueue(order, self.max_pending)
+        except QueueFull:
+            self._count(rejected=1)
+            raise
+        self._count(submitted=1)
+        self._wake.set()
+
+    def start(self):
+        """Start the writer thread (again, if this process was forked since)."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name='order-writer', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=10.0):
+        """Stop the writer and flush whatever can be written within `timeout` seconds."""
+        self._stopping.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.flush(timeout)
+
+    def flush(self, timeout=10.0):
+        """Drain the spool from the calling thread; returns the number of orders still pending."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and self.spool.pending():
+            if not self.drain_once():
+                if self._failures:
+                    break
+                # Remaining entries are claimed by another worker's writer
+                time.sleep(0.05)
+        return self.spool.pending()
+
+    def drain_once(self):
+        """Write one batch; returns the number of orders committed."""
+        batch = self.spool.claim(self._owner, self.batch_size)
+        if not batch:
+            return 0
+        written, handled = [], set()
+        conn = None
+        try:
+            conn = self.pool.acquire()
+            written, error = self._write(conn, batch)
+            if error is not None:
+                print(f"[ORDERS] Write-behind batch of {len(batch)} failed: {error}")
+                self._count(failed_batches=1)
+                if len(batch) == 1:
+                    if self._failed(conn, batch[0], error):
+                        handled.add(batch[0][0])
+                else:
+                    # Find the order(s) at fault by writing them one at a time
+                    for entry in batch:
+                        ok, single_error = self._write(conn, [entry])
+                        if single_error is None:
+                            written.extend(ok)
+                        elif not self._failed(conn, entry, single_error):
+                            break
+                        handled.add(entry[0])
+        except Exception as e:
+            # No connection: the database is unavailable, not the orders at fault
+            print(f"[ORDERS] Write-behind batch of {len(batch)} failed: {e}")
+            self._count(failed_batches=1)
+        finally:
+            if conn is not None:
+                self.pool.release(conn, discard=not _connected(conn))
+
+        handled.update(seq for seq, _ in written)
+        self.spool.unclaim([seq for seq, _ in batch if seq not in handled])
+        if not written:
+            self._failures += 1
+            return 0
+        if self.on_written is not None:
+            try:
+                self.on_written([order for _, order in written])
+            except Exception as e:
+                print(f"[ORDERS] on_written callback failed: {e}")
+        self._failures = 0
+        self._count(batches=1, written=len(written))
+        return len(written)
+
+    def _write(self, conn, entries):
+        """Insert `entries` in one transaction and ack them; returns (written entries, error or None)."""
+        try:
+            insert_orders(conn, [order for _, order in entries], skip_existing=True)
+            conn.commit()
+        except Exception as e:
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            return [], e
+        self.spool.ack([seq for seq, _ in entries])
+        return entries, None
+
+    def _failed(self, conn, entry, error):
+        """
+        Count a failed write of one order against it. Returns False (and counts
+        nothing) when the connection is gone, since then the database is at fault.
+        """
+        if not _connected(conn):
+            return False
+        seq, order = entry
+        self._count(failed_orders=1)
+        if self.spool.fail(seq, error, self.max_attempts):
+            self._count(dead_lettered=1)
+            print(f"[ORDERS] Order {order.get('order_ref')} failed {self.max_attempts} times; "
+                  f"moved to order_spool_dead: {error}")
+        return True
+
+    def _run(self):
+        while not self._stopping.is_set():
+            if self._failures:
+                # Back off while the database is unavailable
+                self._stopping.wait(min(30.0, self.interval * (2 ** min(self._failures, 6))))
+            if self.drain_once():
+                continue
+            self._wake.wait(self.interval)
+            if self._wake.is_set():
+                self._wake.clear()
+                time.sleep(self.group_delay)
+
+    def stats(self):
+        with self._stats_lock:
+            data = dict(self._stats)
+        data['pending'] = self.spool.pending()
+        data['dead'] = self.spool.dead()
+        return data
@@ -0,0 +1,287 @@
+"""
+Order status lifecycle and live status updates.
+
+Orders move through
+
+    pending -> confirmed -> preparing -> ready -> out_for_delivery -> delivered
+
+and can be cancelled until they are out for delivery. `change_status()`
+enforces the transitions, updates `orders.status` and appends a row to
+`order_status_events`.
+
+Customers follow an order over Server-Sent Events (/orders/<ref>/events).
+Open streams do not query the database themselves: each worker process runs
+one `StatusWatcher` thread that reads new events past its watermark once per
+tick (a single indexed range scan, however many customers are waiting) and
+fans them out from memory to the streams subscribed to those orders. A status
+change made in the same process wakes the watcher immediately; changes made
+by other workers are seen on the next tick. AUTO_INCREMENT event ids can
+commit out of order (concurrent changes to different orders), so each tick
+re-reads the last REORDER_WINDOW ids below the watermark and skips the events
+already delivered, rather than trusting everything below it to be complete.
+
+Every open stream occupies a worker thread while it waits, which is why the
+Procfile and Dockerfile run gunicorn with threaded (gthread) workers: with
+sync workers one open order page would block a whole worker. Streams end
+after ORDER_EVENTS_MAX_SECONDS, below the worker timeout, and the browser
+reconnects on its own.
+"""
+import os
+import threading
+import time
+
+from db_sqlite import dialect
+
+REORDER_WINDOW = 200
+
+STATUSES = ('pending', 'confirmed', 'preparing', 'ready', 'out_for_delivery', 'delivered', 'cancelled')
+
+TRANSITIONS = {
+    'pending': ('confirmed', 'cancelled'),
+    'confirmed': ('preparing', 'cancelled'),
+    'preparing': ('ready', 'cancelled'),
+    'ready': ('out_for_delivery', 'cancelled'),
+    'out_for_delivery': ('delivered',),
+    'delivered': (),
+    'cancelled': (),
+}
+
+FINAL_STATUSES = frozenset(s for s, nxt in TRANSITIONS.items() if not nxt)
+
+CANCELLABLE_STATUSES = tuple(s for s in STATUSES if 'cancelled' in TRANSITIONS[s])
+
+LABELS = {
+    'pending': 'Order received',
+    'confirmed': 'Confirmed',
+    'preparing': 'Being prepared',
+    'ready': 'Ready',
+    'out_for_delivery': 'Out for delivery',
+    'delivered': 'Delivered',
+    'cancelled': 'Cancelled',
+}
+
+
+class InvalidTransition(Exception):
+    """Raised by `change_status()` when the order cannot move to the requested status."""
+
+
+def label(status):
+    return LABELS.get(status, status)
+
+
+def change_status(conn, order_id, status):
+    """
+    Move order `order_id` to `status` on `conn` without committing (the caller
+    owns the transaction). Returns the previous status, or None if there is
+    no such order. Raises InvalidTransition for a move the lifecycle does not
+    allow, including one that lost a race with a concurrent change.
+    """
+    if status not in TRANSITIONS:
+        raise InvalidTransition(f'Unknown status: {status}')
+    cur = conn.cursor()
+    try:
+        lock = '' if dialect(conn) == 'sqlite' else ' FOR UPDATE'
+        cur.execute(f"SELECT status FROM orders WHERE order_id = %s{lock}", (order_id,))
+        row = cur.fetchone()
+        if row is None:
+            return None
+        current = row[0] or 'pending'
+        if status not in TRANSITIONS.get(current, ()):
+            raise InvalidTransition(f'Cannot change an order from {current} to {status}')
+        # Compare-and-set, so two concurrent changes cannot both apply
+        cur.execute("UPDATE orders SET status = %s WHERE order_id = %s AND status = %s",
+                    (status, order_id, current))
+        if cur.rowcount != 1:
+            raise InvalidTransition(f'Order {order_id} changed status concurrently')
+        cur.execute("INSERT INTO order_status_events (order_id, status) VALUES (%s, %s)", (order_id, status))
+        return current
+    finally:
+        cur.close()
+
+
+class Subscription:
+    """One waiting client. Only the latest event is kept: a status is a state, not a log."""
+
+    def __init__(self, order_ref):
+        self.order_ref = order_ref
+        self._event = None
+        self._cond = threading.Condition()
+
+    def push(self, event):
+        with self._cond:
+            self._event = event
+            self._cond.notify()
+
+    def wait(self, timeout):
+        """The next event, or None if nothing happened within `timeout` seconds."""
+        with self._cond:
+            if self._event is None:
+                self._cond.wait(timeout)
+            event, self._event = self._event, None
+            return event
+
+
+class StatusWatcher:
+    def __init__(self, pool, interval=1.0, batch_size=500):
+        self.pool = pool
+        self.interval = float(interval)
+        self.batch_size = int(batch_size)
+        self.watermark = None   # highest event_id read; None until the first poll
+        self._seen = set()      # event ids within REORDER_WINDOW of the watermark
+        self._subscribers = {}  # order_ref -> set of Subscription
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._poll_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pid = None
+        self._stats = {'polls': 0, 'poll_errors': 0, 'events': 0, 'deliveries': 0, 'last_poll_ms': 0.0}
+
+    # -- subscribers -----------------------------------------------------
+
+    def subscribe(self, order_ref):
+        self.ensure_started()
+        sub = Subscription(order_ref)
+        with self._lock:
+            self._subscribers.setdefault(order_ref, set()).add(sub)
+        if self.watermark is None:
+            # Fix the starting point now, before the caller reads the current status
+            try:
+                self.poll()
+            except Exception:
+                pass
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            subs = self._subscribers.get(sub.order_ref)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[sub.order_ref]
+
+    def add_listener(self, callback):
+        """
+        Call `callback(events)` after every poll, on the watcher thread; `events`
+        is empty when nothing changed, so the callback can piggyback its own
+        incremental refresh on the watcher's tick.
+        """
+        self._listeners.append(callback)
+        self.ensure_started()
+
+    def wake(self):
+        """Poll now rather than at the next tick (after a change made in this process)."""
+        self._wake.set()
+
+    # -- polling ---------------------------------------------------------
+
+    def poll(self):
+        """Read events past the watermark and fan them out; returns how many were read."""
+        with self._poll_lock:
+            return self._poll()
+
+    def _poll(self):
+        started = time.perf_counter()
+        conn = self.pool.acquire()
+        try:
+            cur = conn.cursor()
+            try:
+                if self.watermark is None:
+                    # Start from now: streams read the current status when they open
+                    cur.execute("SELECT COALESCE(MAX(event_id), 0) FROM order_status_events")
+                    watermark = cur.fetchone()[0]
+                    cur.execute("SELECT event_id FROM order_status_events WHERE event_id > %s",
+                                (max(0, watermark - REORDER_WINDOW),))
+                    self._seen = {r[0] for r in cur.fetchall()}
+                    self.watermark = watermark
+                rows = self._new_events(cur)
+            finally:
+                cur.close()
+        except Exception:
+            self.pool.release(conn, discard=True)
+            raise
+        self.pool.release(conn)
+
+        events = [{
+            'event_id': r[0],
+            'order_id': r[1],
+            'order_ref': r[2],
+            'status': r[3],
+            'label': label(r[3]),
+            'updated_at': r[4].isoformat() if r[4] else None,
+        } for r in rows]
+        if events:
+            self._seen.update(event['event_id'] for event in events)
+            self.watermark = max(self.watermark, events[-1]['event_id'])
+            floor = self.watermark - REORDER_WINDOW
+            self._seen = {i for i in self._seen if i > floor}
+        self._publish(events)
+        with self._lock:
+            self._stats['polls'] += 1
+            self._stats['events'] += len(events)
+            self._stats['last_poll_ms'] = (time.perf_counter() - started) * 1000
+        return len(events)
+
+    def _new_events(self, cur):
+        """Events past the watermark, plus late commits within REORDER_WINDOW below it."""
+        rows = []
+        floor = max(0, self.watermark - REORDER_WINDOW)
+        while True:
+            cur.execute(
+                "SELECT e.event_id, e.order_id, o.order_ref, e.status, e.created_at "
+                "FROM order_status_events e JOIN orders o ON o.order_id = e.order_id "
+                "WHERE e.event_id > %s ORDER BY e.event_id LIMIT %s",
+                (floor, self.batch_size))
+            batch = cur.fetchall()
+            rows.extend(r for r in batch if r[0] not in self._seen)
+            if len(batch) < self.batch_size:
+                return rows
+            floor = batch[-1][0]
+
+    def _publish(self, events):
+        delivered = 0
+        with self._lock:
+            targets = [(event, list(self._subscribers.get(event['order_ref'], ()))) for event in events]
+        for event, subs in targets:
+            for sub in subs:
+                sub.push(event)
+            delivered += len(subs)
+        for callback in self._listeners:
+            try:
+                callback(events)
+            except Exception as e:
+                print(f"WARNING: order status listener failed: {e}")
+        with self._lock:
+            self._stats['deliveries'] += delivered
+
+    def ensure_started(self):
+        """Start the watcher thread in this process (again after a fork)."""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            if self._pid is not None:
+                # Subscribers of the parent process are not ours
+                self._subscribers.clear()
+            self._pid = pid
+        threading.Thread(target=self._run, name='order-status-watcher', daemon=True).start()
+
+    def _run(self):
+        while True:
+            try:
+                self.poll()
+            except Exception as e:
+                with self._lock:
+                    self._stats['poll_errors'] += 1
+                print(f"WARNING: order status watcher poll failed: {e}")
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def stats(self):
+        with self._lock:
+            data = dict(self._stats)
+            data['subscribers'] = sum(len(subs) for subs in self._subscribers.values())
+            data['orders_watched'] = len(self._subscribers)
+        data['watermark'] = self.watermark
+        return data
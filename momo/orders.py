@@ -0,0 +1,57 @@
+"""
+Order persistence shared by the synchronous checkout path and the
+write-behind queue (order_queue.py).
+
+An order is a plain JSON-serialisable dict:
+    {'order_ref', 'user_id', 'name', 'email', 'address', 'payment', 'total',
+     'lines': [{'id', 'name', 'price', 'quantity'}, ...]}
+`order_ref` is generated at checkout and is unique in the orders table, which
+makes re-delivering the same order (e.g. replaying the spool after a crash)
+harmless.
+"""
+import secrets
+
+
+def new_order_ref():
+    return secrets.token_hex(8)
+
+
+def insert_orders(conn, orders, skip_existing=False):
+    """
+    Insert order headers, their lines and the customers' saved addresses on
+    `conn` without committing; the caller owns the transaction, so a batch of
+    orders can share one commit. Returns {order_ref: order_id} for the
+    orders inserted.
+    """
+    cur = conn.cursor()
+    try:
+        if skip_existing and orders:
+            refs = [order['order_ref'] for order in orders]
+            placeholders = ','.join(['%s'] * len(refs))
+            cur.execute(f"SELECT order_ref FROM orders WHERE order_ref IN ({placeholders})", tuple(refs))
+            existing = {row[0] for row in cur.fetchall()}
+            orders = [order for order in orders if order['order_ref'] not in existing]
+
+        ids = {}
+        lines = []
+        addresses = []
+        for order in orders:
+            cur.execute("INSERT INTO orders (order_ref, user_id, name, email, total, address, payment) "
+                        "VALUES (%s,%s,%s,%s,%s,%s,%s)",
+                        (order['order_ref'], order.get('user_id'), order.get('name'), order.get('email'),
+                         order['total'], order.get('address'), order.get('payment')))
+            order_id = cur.lastrowid
+            ids[order['order_ref']] = order_id
+            lines.extend((order_id, it['id'], it['name'], it['price'], it['quantity']) for it in order['lines'])
+            if order.get('user_id'):
+                addresses.append((order.get('address'), order['user_id']))
+
+        # All lines (and address updates) of the batch in one executemany each
+        if lines:
+            cur.executemany("INSERT INTO order_items (order_id, item_id, name, unit_price, quantity) "
+                            "VALUES (%s,%s,%s,%s,%s)", lines)
+        if addresses:
+            cur.executemany("UPDATE users SET address = %s WHERE user_id = %s", addresses)
+        return ids
+    finally:
+        cur.close()
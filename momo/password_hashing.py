@@ -0,0 +1,89 @@
+"""
+Password hashing off the request thread.
+
+werkzeug's scrypt/pbkdf2 hashes are deliberately slow and hold the GIL, so
+running them on request threads lets a burst of logins stall every other
+request in the worker. `PasswordHasher` runs them in a small process pool
+instead:
+
+  - at most `max_pending` hash operations may be queued or running per
+    worker; beyond that (or when one takes longer than `timeout`) the call
+    fails fast with HashingBusy instead of piling up work;
+  - `method` is the werkzeug hash method, optionally with its cost parameters
+    (e.g. 'scrypt:32768:8:1' or 'pbkdf2:sha256:600000'); `needs_rehash()`
+    reports stored hashes made with different parameters so login can
+    upgrade them transparently;
+  - workers=0 hashes inline, which suits single-threaded dev servers and
+    serverless functions where spawning processes is not worthwhile.
+"""
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HashingBusy(Exception):
+    """Raised when the hashing pool is saturated or an operation times out."""
+
+
+class PasswordHasher:
+    def __init__(self, method='scrypt:32768:8:1', workers=2, max_pending=32, timeout=5.0):
+        # werkzeug fills in defaults ('pbkdf2' is stored as 'pbkdf2:sha256:600000'), so keep
+        # the prefix it really writes; comparing the configured string would rehash every login
+        self.method = generate_password_hash('', method, salt_length=1).split('$', 1)[0]
+        self.workers = int(workers)
+        self.timeout = float(timeout)
+        self._slots = threading.BoundedSemaphore(max(1, int(max_pending)))
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, stored, password):
+        if not stored or '$' not in stored:
+            # Not a werkzeug hash (e.g. a legacy plaintext password); nothing to compute
+            return False
+        return self._run(check_password_hash, stored, password)
+
+    def needs_rehash(self, stored):
+        """True when `stored` was produced with a different method or cost than `self.method`."""
+        return stored.split('$', 1)[0] != self.method
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def _pool(self):
+        # Created lazily, and again after a fork, so each gunicorn worker owns its pool
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                self._pid = os.getpid()
+            return self._executor
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy('Too many password hash operations in progress')
+        if self.workers <= 0:
+            try:
+                return fn(*args)
+            finally:
+                self._slots.release()
+
+        try:
+            future = self._pool().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        # The slot is held until the work really finishes, even if we stop waiting for it
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise HashingBusy(f'Password hashing took longer than {self.timeout:.1f}s')
@@ -0,0 +1,162 @@
+"""
+Per-user cache of the profile page's data (user row, saved address, first
+page of orders).
+
+That data only changes when the user registers, checks out (including when
+the write-behind queue lands the order), saves an address, or when one of
+their orders changes status. Those write paths call `invalidate(user_id)`,
+which bumps the user's version; a cached entry is served only while its
+version is current, so an invalidation takes effect on the very next request
+rather than after the TTL. The TTL and `max_entries` (LRU) only bound memory.
+
+Where the versions live decides who sees an invalidation:
+
+  - MemoryVersionStore: this process only. Fine for a single worker.
+  - SQLiteVersionStore: a local WAL-mode file shared by every gunicorn worker
+    on the host; checking a version is one primary-key lookup in it, far
+    cheaper than the queries it saves.
+
+With read replicas, data read from a replica may predate a write made just
+before the read. An entry read from a replica within `replica_lag` seconds of
+the user's last invalidation is therefore not cached.
+
+Select with PROFILE_CACHE_STORE=sqlite|memory|off (see `create_profile_cache`);
+the app defaults to sqlite.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from sqlite_util import ThreadLocalDB
+
+
+class MemoryVersionStore:
+    def __init__(self, max_entries=100000):
+        self.max_entries = int(max_entries)
+        self._versions = OrderedDict()  # user_id -> (version, changed_at)
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        """(version, time of the last invalidation) for `user_id`."""
+        with self._lock:
+            return self._versions.get(user_id, (0, 0.0))
+
+    def bump(self, user_ids, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            for user_id in user_ids:
+                version, _ = self._versions.pop(user_id, (0, 0.0))
+                self._versions[user_id] = (version + 1, now)
+            while len(self._versions) > self.max_entries:
+                # Forgetting a version only matters for entries cached at it, which
+                # the caller drops locally on every bump
+                self._versions.popitem(last=False)
+
+
+class SQLiteVersionStore:
+    def __init__(self, path):
+        self._db = ThreadLocalDB(path)
+        self._db.get().execute('''
+            CREATE TABLE IF NOT EXISTS profile_versions (
+                user_id INTEGER PRIMARY KEY,
+                version INTEGER NOT NULL,
+                changed_at REAL NOT NULL
+            )
+        ''')
+
+    def get(self, user_id):
+        row = self._db.get().execute(
+            "SELECT version, changed_at FROM profile_versions WHERE user_id = ?", (user_id,)).fetchone()
+        return (row[0], row[1]) if row else (0, 0.0)
+
+    def bump(self, user_ids, now=None):
+        now = time.time() if now is None else now
+        self._db.get().executemany(
+            "INSERT INTO profile_versions (user_id, version, changed_at) VALUES (?, 1, ?) "
+            "ON CONFLICT(user_id) DO UPDATE SET version = version + 1, changed_at = excluded.changed_at",
+            [(user_id, now) for user_id in user_ids])
+
+
+class ProfileCache:
+    def __init__(self, versions, max_entries=10000, ttl=300.0, replica_lag=0.0):
+        self.versions = versions
+        self.max_entries = int(max_entries)
+        self.ttl = float(ttl)
+        self.replica_lag = float(replica_lag)
+        self._entries = OrderedDict()  # user_id -> (version, expires_at, data)
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'stores': 0, 'invalidations': 0, 'skipped_replica': 0,
+                       'version_errors': 0}
+
+    def lookup(self, user_id):
+        """
+        (data, version): the cached data, or None plus the version to pass to
+        `store()` once the data has been loaded. Read the version before
+        loading, so a write that lands meanwhile leaves the entry stale.
+        """
+        try:
+            version, changed_at = self.versions.get(user_id)
+        except Exception as e:
+            print(f"WARNING: profile cache version lookup failed: {e}")
+            with self._lock:
+                self._stats['version_errors'] += 1
+            return None, None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] == version and entry[1] > now:
+                self._entries.move_to_end(user_id)
+                self._stats['hits'] += 1
+                return entry[2], (version, changed_at)
+            if entry is not None:
+                del self._entries[user_id]
+            self._stats['misses'] += 1
+        return None, (version, changed_at)
+
+    def store(self, user_id, version, data, from_replica=False):
+        if version is None or self.max_entries <= 0:
+            return
+        number, changed_at = version
+        if from_replica and time.time() - changed_at < self.replica_lag:
+            # The replica may not have caught up with the write behind that invalidation
+            with self._lock:
+                self._stats['skipped_replica'] += 1
+            return
+        with self._lock:
+            self._entries[user_id] = (number, time.monotonic() + self.ttl, data)
+            self._entries.move_to_end(user_id)
+            self._stats['stores'] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *user_ids):
+        user_ids = [u for u in user_ids if u is not None]
+        if not user_ids:
+            return
+        with self._lock:
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+            self._stats['invalidations'] += len(user_ids)
+        try:
+            self.versions.bump(user_ids)
+        except Exception as e:
+            print(f"WARNING: profile cache invalidation failed: {e}")
+            with self._lock:
+                self._stats['version_errors'] += 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries))
+
+
+def create_profile_cache(store='memory', path=None, max_entries=10000, ttl=300.0, replica_lag=0.0):
+    store = (store or 'memory').lower()
+    if store == 'off':
+        return None
+    if store == 'memory':
+        return ProfileCache(MemoryVersionStore(), max_entries, ttl, replica_lag)
+    if store == 'sqlite':
+        if not path:
+            raise ValueError('PROFILE_CACHE_STORE=sqlite requires PROFILE_CACHE_PATH')
+        return ProfileCache(SQLiteVersionStore(path), max_entries, ttl, replica_lag)
+    raise ValueError(f'Unknown profile cache store: {store}')
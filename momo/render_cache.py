@@ -0,0 +1,95 @@
+"""
+In-process cache of rendered HTML for pages that are the same for every visitor.
+
+The home page and the two menu pages only vary by login state (the nav shows
+the username) and by pending flash messages. Their rendered bytes are kept in
+an LRU keyed by (template, template mtime, username); the mtime means an
+edited template is picked up without a restart when Jinja auto-reload is on.
+Requests with pending flashes are rendered normally and never cached, so a
+flash is shown (and consumed) exactly once.
+
+Each entry carries a strong ETag (hash of the body), so repeat visitors
+revalidate with If-None-Match and get a 304 without a body. Memory is bounded
+by both entry count and total body bytes.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+
+class RenderCache:
+    def __init__(self, max_entries=256, max_bytes=16 * 1024 * 1024):
+        self.max_entries = int(max_entries)
+        self.max_bytes = int(max_bytes)
+        self._entries = OrderedDict()  # key -> (body, etag), least recently used first
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'bypassed': 0, 'evictions': 0}
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters['hits'] += 1
+            return entry
+
+    def put(self, key, html):
+        """Store rendered `html` and return its (body bytes, strong etag)."""
+        body = html.encode('utf-8')
+        entry = (body, hashlib.sha256(body).hexdigest()[:32])
+        if len(body) > self.max_bytes:
+            return entry
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old[0])
+            self._entries[key] = entry
+            self._bytes += len(body)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self._counters['evictions'] += 1
+        return entry
+
+    def bypass(self):
+        self._counters['bypassed'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters, entries=len(self._entries), bytes=self._bytes)
+
+
+class TemplateMtimes:
+    """Resolves a template name to its file's mtime (None when not loaded from disk)."""
+
+    def __init__(self, jinja_env):
+        self.jinja_env = jinja_env
+        self._paths = {}
+
+    def __call__(self, name):
+        path = self._paths.get(name)
+        if path is None:
+            try:
+                _, path, _ = self.jinja_env.loader.get_source(self.jinja_env, name)
+            except Exception:
+                path = ''
+            self._paths[name] = path or ''
+        if not path:
+            return None
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
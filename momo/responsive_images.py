@@ -0,0 +1,121 @@
+"""
+Responsive <picture> markup for menu images.
+
+`scripts/build_responsive_images.py` writes resized AVIF/WebP variants of the
+images in static/ to static/responsive/ and records them in
+static/responsive/manifest.json:
+
+    {"classic_momo.jpg": {"width": 1200, "height": 800, "sha256": "...",
+                          "variants": {"avif": [[320, "responsive/classic_momo-320.avif"], ...],
+                                       "webp": [[320, "responsive/classic_momo-320.webp"], ...]}}}
+
+For images in the manifest the browser gets one <source> per format with a
+width-described srcset and picks the smallest file that fills the slot. Images
+that have not been built but are hosted on Cloudinary get a srcset of
+Cloudinary resize transformations instead (f_auto also negotiates the format);
+anything else falls back to the single URL `cloud_image()` already returned.
+"""
+import json
+import os
+
+from markupsafe import Markup, escape
+
+MANIFEST_PATH = os.path.join(os.path.dirname(__file__), 'static', 'responsive', 'manifest.json')
+
+# Widths built by the script and requested from Cloudinary when there is no local build
+DEFAULT_WIDTHS = (320, 640, 960, 1280)
+
+# Preferred order: the browser takes the first <source> whose type it supports
+FORMAT_TYPES = (('avif', 'image/avif'), ('webp', 'image/webp'))
+
+_CLOUDINARY_UPLOAD = '/image/upload/'
+
+
+def load_manifest(path=MANIFEST_PATH):
+    try:
+        with open(path, 'r', encoding='utf-8') as fh:
+            return json.load(fh)
+    except Exception:
+        return {}
+
+
+def cloudinary_resized(url, width):
+    """Insert a resize transformation into a Cloudinary delivery URL."""
+    head, sep, tail = url.partition(_CLOUDINARY_UPLOAD)
+    if not sep:
+        return None
+    return f'{head}{sep}w_{width},c_limit,f_auto,q_auto/{tail}'
+
+
+def _attrs(attrs):
+    parts = []
+    for name, value in attrs.items():
+        if value is None or value is False:
+            continue
+        name = name.rstrip('_').replace('_', '-')  # class_ -> class, data_id -> data-id
+        parts.append(name if value is True else f'{name}="{escape(value)}"')
+    return ' '.join(parts)
+
+
+class ResponsiveImages:
+    def __init__(self, manifest, cloud_map, widths=DEFAULT_WIDTHS):
+        self.manifest = manifest
+        self.cloud_map = cloud_map
+        self.widths = tuple(widths)
+        self._cache = {}
+
+    def sources(self, filename, static_url):
+        """Return [(mime_type, srcset)] for the built variants of `filename`, best format first."""
+        entry = self.manifest.get(filename)
+        if not entry:
+            return []
+        variants = entry.get('variants') or {}
+        result = []
+        for fmt, mime in FORMAT_TYPES:
+            pairs = variants.get(fmt)
+            if pairs:
+                result.append((mime, ', '.join(f'{static_url(path)} {width}w' for width, path in pairs)))
+        return result
+
+    def cloud_srcset(self, filename):
+        url = self.cloud_map.get(filename)
+        if not url or _CLOUDINARY_UPLOAD not in url:
+            return None
+        return ', '.join(f'{cloudinary_resized(url, width)} {width}w' for width in self.widths)
+
+    def picture(self, filename, src, static_url, alt='', sizes='100vw', **attrs):
+        """
+        Markup for `filename`: a <picture> when local variants exist, otherwise an
+        <img> with a Cloudinary srcset if hosted there, otherwise a plain <img>.
+        `src` is the fallback URL; extra keyword arguments become <img> attributes.
+        """
+        key = (filename, src, alt, sizes, tuple(sorted(attrs.items())))
+        html = self._cache.get(key)
+        if html is not None:
+            return html
+
+        entry = self.manifest.get(filename) or {}
+        img_attrs = {'src': src, 'alt': alt}
+        if entry.get('width') and entry.get('height'):
+            # Intrinsic size lets the browser reserve space before the image loads
+            img_attrs['width'] = entry['width']
+            img_attrs['height'] = entry['height']
+        img_attrs.update(attrs)
+
+        sources = self.sources(filename, static_url)
+        if sources:
+            parts = ['<picture>']
+            for mime, srcset in sources:
+                parts.append(f'<source type="{mime}" srcset="{escape(srcset)}" sizes="{escape(sizes)}">')
+            parts.append(f'<img {_attrs(img_attrs)}>')
+            parts.append('</picture>')
+            html = Markup(''.join(parts))
+        else:
+            srcset = self.cloud_srcset(filename)
+            if srcset:
+                img_attrs['srcset'] = srcset
+                img_attrs['sizes'] = sizes
+            html = Markup(f'<img {_attrs(img_attrs)}>')
+
+        self._cache[key] = html
+        return html
@@ -0,0 +1,254 @@
+"""
+Sales analytics export (`flask --app app export-sales`).
+
+Orders are streamed from the database in `chunk_size` batches through an
+unbuffered cursor (a server-side stream on MySQL) joined to their order_items
+lines, and folded into three aggregates as they arrive:
+
+  - daily:    day -> orders, items sold, revenue
+  - dishes:   dish -> orders, quantity, revenue
+  - payments: payment method -> orders, revenue
+
+Memory is bounded by the number of days and dishes, not orders, so a full
+history exports as cheaply as a week. The date range (`since`/`until`) is a
+range condition on orders.created_at, which idx_orders_created serves.
+
+Orders written before order_items existed and not backfilled still only have
+the JSON `orders.items` column. Their lines are decoded inline, or with
+`workers` > 0 in a process pool, a bounded number of chunks at a time.
+
+Output is one CSV per aggregate, or Parquet when pyarrow is installed.
+"""
+import csv
+import json
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+
+REPORTS = {
+    'daily': ('day', 'orders', 'items', 'revenue'),
+    'dishes': ('item_id', 'name', 'orders', 'quantity', 'revenue'),
+    'payments': ('payment', 'orders', 'revenue'),
+}
+
+LEGACY_CHUNK = 500
+
+
+def legacy_lines(raw):
+    """[(item_id, name, unit_price, quantity)] from a legacy orders.items JSON blob."""
+    try:
+        items = json.loads(raw) if raw else []
+    except ValueError:
+        return []
+    lines = []
+    for item in items if isinstance(items, list) else []:
+        if not isinstance(item, dict):
+            continue
+        try:
+            price = Decimal(str(item.get('price', 0)))
+            quantity = int(item.get('quantity', 1))
+        except (InvalidOperation, TypeError, ValueError):
+            continue
+        lines.append((str(item.get('id', '')), str(item.get('name', '')), price, quantity))
+    return lines
+
+
+def _decode_chunk(blobs):
+    """Process pool entry point: decode a list of blobs into their lines."""
+    return [legacy_lines(raw) for raw in blobs]
+
+
+class SalesAggregate:
+    def __init__(self):
+        self.daily = {}     # day -> [orders, items, revenue]
+        self.dishes = {}    # item_id -> [name, orders, quantity, revenue]
+        self.payments = {}  # payment -> [orders, revenue]
+        self.orders = 0
+        self.legacy_orders = 0
+
+    def add_order(self, day, payment, total):
+        self.orders += 1
+        total = total or Decimal('0')
+        daily = self.daily.setdefault(day, [0, 0, Decimal('0')])
+        daily[0] += 1
+        daily[2] += total
+        pay = self.payments.setdefault(payment or 'unknown', [0, Decimal('0')])
+        pay[0] += 1
+        pay[1] += total
+
+    def add_lines(self, day, lines):
+        """The lines of one order: [(item_id, name, unit_price, quantity)]."""
+        seen = set()
+        for item_id, name, price, quantity in lines:
+            dish = self.dishes.setdefault(item_id, [name, 0, 0, Decimal('0')])
+            if item_id not in seen:
+                dish[1] += 1
+                seen.add(item_id)
+            dish[2] += quantity
+            dish[3] += price * quantity
+            self.daily[day][1] += quantity
+
+    def rows(self, report):
+        if report == 'daily':
+            return [(day, *values) for day, values in sorted(self.daily.items())]
+        if report == 'dishes':
+            return sorted(((item_id, *values) for item_id, values in self.dishes.items()),
+                          key=lambda row: (-row[4], row[0]))
+        if report == 'payments':
+            return sorted(((payment, *values) for payment, values in self.payments.items()),
+                          key=lambda row: (-row[2], row[0]))
+        raise ValueError(f'Unknown report: {report}')
+
+
+def parse_day(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except (TypeError, ValueError):
+        raise ValueError(f'Expected a date as YYYY-MM-DD, got {value!r}')
+
+
+def stream_sales(conn, since=None, until=None, chunk_size=1000, workers=0, include_cancelled=False):
+    """
+    Aggregate the orders placed in [since, until] (dates, both inclusive) on
+    `conn`. The rows of one order arrive together (ordered by created_at,
+    order_id), so each order is complete once the next one starts.
+    """
+    where, params = [], []
+    if since is not None:
+        where.append("o.created_at >= %s")
+        params.append(since)
+    if until is not None:
+        where.append("o.created_at < %s")
+        params.append(until + timedelta(days=1))
+    if not include_cancelled:
+        where.append("o.status <> 'cancelled'")
+    sql = ("SELECT o.order_id, o.created_at, o.payment, o.total, o.items, "
+           "oi.item_id, oi.name, oi.unit_price, oi.quantity "
+           "FROM orders o LEFT JOIN order_items oi ON oi.order_id = o.order_id")
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    # Only on orders columns, which idx_orders_created (created_at, PK) already delivers in
+    # order; sorting on an order_items column would make MySQL filesort the whole join first.
+    # Each order's lines still arrive together, which is all the aggregation needs.
+    sql += " ORDER BY o.created_at, o.order_id"
+
+    agg = SalesAggregate()
+    legacy = LegacyDecoder(agg, workers)
+    current = None  # [order_id, day, lines]
+
+    def finish(order):
+        if order is not None and order[2]:
+            agg.add_lines(order[1], order[2])
+
+    cur = conn.cursor(buffered=False)
+    try:
+        cur.execute(sql, tuple(params))
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            for order_id, created_at, payment, total, raw_items, item_id, name, price, quantity in rows:
+                if current is None or current[0] != order_id:
+                    finish(current)
+                    day = created_at.date().isoformat() if created_at else 'unknown'
+                    agg.add_order(day, payment, total)
+                    current = [order_id, day, []]
+                    if item_id is None and raw_items:
+                        legacy.add(day, raw_items)
+                if item_id is not None:
+                    current[2].append((item_id, name, price, quantity))
+        finish(current)
+    finally:
+        cur.close()
+        legacy.close()
+    agg.legacy_orders = legacy.decoded
+    return agg
+
+
+class LegacyDecoder:
+    """Decodes legacy JSON lines inline, or in a process pool with few chunks in flight."""
+
+    def __init__(self, agg, workers=0):
+        self.agg = agg
+        self.workers = int(workers)
+        self._days = []
+        self._blobs = []
+        self._pending = []
+        self._pool = ProcessPoolExecutor(self.workers) if self.workers > 0 else None
+        self.decoded = 0
+
+    def add(self, day, raw):
+        if self._pool is None:
+            self.agg.add_lines(day, legacy_lines(raw))
+            self.decoded += 1
+            return
+        self._days.append(day)
+        self._blobs.append(raw)
+        if len(self._blobs) >= LEGACY_CHUNK:
+            self._submit()
+
+    def _submit(self):
+        if self._blobs:
+            self._pending.append((self._days, self._pool.submit(_decode_chunk, self._blobs)))
+            self._days, self._blobs = [], []
+        # Bound memory: keep at most two chunks per worker in flight
+        while len(self._pending) > self.workers * 2:
+            self._collect(self._pending.pop(0))
+
+    def _collect(self, pending):
+        days, future = pending
+        for day, lines in zip(days, future.result()):
+            self.agg.add_lines(day, lines)
+            self.decoded += 1
+
+    def close(self):
+        if self._pool is None:
+            return
+        try:
+            self._submit()
+            while self._pending:
+                self._collect(self._pending.pop(0))
+        finally:
+            self._pool.shutdown()
+
+
+def _number(value):
+    return float(value) if isinstance(value, Decimal) else value
+
+
+def write_csv(path, columns, rows):
+    """Write to a temp file in the same directory, then rename over `path`."""
+    fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', suffix='.csv', dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='') as fh:
+            writer = csv.writer(fh)
+            writer.writerow(columns)
+            writer.writerows(rows)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_parquet(path, columns, rows):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    table = pa.table({name: [_number(row[i]) for row in rows] for i, name in enumerate(columns)})
+    tmp_path = path + '.tmp'
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def write_reports(agg, output_dir, fmt='csv', reports=tuple(REPORTS)):
+    """Write each report to `output_dir`/sales_<report>.<fmt>; returns the paths."""
+    os.makedirs(output_dir, exist_ok=True)
+    writer = write_parquet if fmt == 'parquet' else write_csv
+    paths = []
+    for report in reports:
+        path = os.path.join(output_dir, f'sales_{report}.{fmt}')
+        writer(path, REPORTS[report], agg.rows(report))
+        paths.append(path)
+    return paths
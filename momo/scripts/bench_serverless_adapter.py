@@ -0,0 +1,111 @@
+"""
+Benchmark the per-invocation overhead of the Netlify function handler.
+
+Compares the previous handler (a new `app.test_client()` per invocation with a
+hand-built query string) against `serverless.handle_event`, using the same
+Lambda events against routes that do not need a database.
+
+Usage:
+  - Run: `python scripts/bench_serverless_adapter.py [--iterations 2000]`
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# The benchmark only uses routes that do not touch the database; fail fast if it is absent
+os.environ.setdefault('DB_CONNECT_RETRIES', '1')
+os.environ.setdefault('DB_CONNECT_BACKOFF', '0')
+
+from app import app  # noqa: E402
+from serverless import handle_event  # noqa: E402
+
+
+def legacy_handler(event, context):
+    """The handler previously shipped in .netlify/functions/api.py."""
+    path = event.get('path', '')
+    method = event.get('httpMethod', 'GET')
+    headers = event.get('headers', {})
+    body = event.get('body', '')
+    query_params = event.get('queryStringParameters', {})
+
+    with app.test_client() as client:
+        query_string = '&'.join([f"{k}={v}" for k, v in (query_params or {}).items()])
+        full_path = path
+        if query_string:
+            full_path = f"{path}?{query_string}"
+
+        if method == 'GET':
+            response = client.get(full_path, headers=headers)
+        elif method == 'POST':
+            response = client.post(full_path, data=body, headers=headers)
+        else:
+            response = client.get(full_path, headers=headers)
+
+    return {
+        'statusCode': response.status_code,
+        'body': response.get_data(as_text=True),
+        'headers': dict(response.headers)
+    }
+
+
+def adapter_handler(event, context):
+    return handle_event(app, event, context)
+
+
+EVENTS = {
+    'menu-json': {
+        'httpMethod': 'GET', 'path': '/api/menu',
+        'headers': {'host': 'example.netlify.app', 'accept': 'application/json'},
+        'queryStringParameters': {'v': '1'},
+    },
+    'menu-page': {
+        'httpMethod': 'GET', 'path': '/menu',
+        'headers': {'host': 'example.netlify.app', 'accept': 'text/html'},
+        'queryStringParameters': {'filter': 'veg'},
+    },
+    'image': {
+        'httpMethod': 'GET', 'path': '/static/front_pic.png',
+        'headers': {'host': 'example.netlify.app'},
+    },
+}
+
+
+def bench(handler, event, iterations):
+    handler(event, None)  # warm-up
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        handler(event, None)
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    return {
+        'mean_us': statistics.fmean(samples) * 1e6,
+        'p50_us': samples[len(samples) // 2] * 1e6,
+        'p95_us': samples[int(len(samples) * 0.95)] * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'event':<12} {'handler':<8} {'mean us':>10} {'p50 us':>10} {'p95 us':>10}")
+    for name, event in EVENTS.items():
+        for label, handler in (('legacy', legacy_handler), ('adapter', adapter_handler)):
+            try:
+                result = bench(handler, event, args.iterations)
+            except Exception as e:
+                # e.g. the legacy handler cannot return binary bodies
+                print(f"{name:<12} {label:<8} failed: {type(e).__name__}: {e}")
+                continue
+            print(f"{name:<12} {label:<8} {result['mean_us']:>10.1f} {result['p50_us']:>10.1f} {result['p95_us']:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""
+Fingerprint static assets and write precompressed gzip/brotli variants to `static/dist/`.
+
+Usage:
+  - Run after changing anything in `static/` (and after build_responsive_images.py):
+    `python scripts/build_assets.py [--keep-old]`
+  - Brotli output needs the optional `brotli` package (`pip install brotli`); without it
+    only `.gz` files are written.
+
+Every file under `static/` (except `dist/` itself and the JSON data files the app reads
+directly) is copied to `static/dist/<path>/<stem>.<hash><ext>`, where the hash is the first
+10 hex digits of its SHA-256. Text assets (CSS, JS, SVG, ...) also get `.gz` and `.br`
+siblings, kept only when they are actually smaller. The mapping is written to
+`static/dist/manifest.json` (see static_assets.py); hashed files from previous builds that
+are no longer referenced are removed unless --keep-old is given.
+"""
+import argparse
+import gzip
+import hashlib
+import os
+import shutil
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from file_util import write_json_atomic  # noqa: E402
+from static_assets import DIST_DIR, MANIFEST_NAME  # noqa: E402
+
+STATIC_DIR = os.path.join(ROOT, 'static')
+COMPRESSIBLE = ('.css', '.js', '.svg', '.html', '.txt', '.xml', '.ico', '.map', '.webmanifest')
+# Read by the app or scripts from static/ by name, not served to browsers
+SKIP_FILES = {'cloudinary_map.json', 'cloudinary_manifest.json', 'responsive/manifest.json'}
+HASH_LENGTH = 10
+
+
+def iter_assets(static_dir, dist_dir):
+    for dirpath, dirnames, filenames in os.walk(static_dir):
+        if os.path.abspath(dirpath) == os.path.abspath(dist_dir):
+            dirnames[:] = []
+            continue
+        dirnames[:] = [d for d in dirnames if os.path.abspath(os.path.join(dirpath, d)) != os.path.abspath(dist_dir)]
+        for fname in filenames:
+            rel = os.path.relpath(os.path.join(dirpath, fname), static_dir).replace(os.sep, '/')
+            if fname.startswith('.') or rel in SKIP_FILES:
+                continue
+            yield rel
+
+
+def hashed_name(rel, digest):
+    directory, fname = os.path.split(rel)
+    stem, ext = os.path.splitext(fname)
+    name = f'{stem}.{digest[:HASH_LENGTH]}{ext}'
+    return f'{directory}/{name}' if directory else name
+
+
+def compress_variants(data):
+    """Return {encoding: (suffix, bytes)} for the encodings that shrink `data`."""
+    variants = {'gzip': ('.gz', gzip.compress(data, compresslevel=9, mtime=0))}
+    try:
+        import brotli
+    except Exception:
+        brotli = None
+    if brotli is not None:
+        variants['br'] = ('.br', brotli.compress(data, quality=11))
+    return {enc: v for enc, v in variants.items() if len(v[1]) < len(data)}
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if os.path.exists(path):
+        return  # hashed names are content-addressed; an existing file is identical
+    with open(path, 'wb') as fh:
+        fh.write(data)
+
+
+def build(static_dir=STATIC_DIR, dist_dir=DIST_DIR, keep_old=False):
+    dist_prefix = os.path.basename(dist_dir)
+    files, encodings = {}, {}
+    written = set()
+    saved = 0
+    for rel in sorted(iter_assets(static_dir, dist_dir)):
+        src = os.path.join(static_dir, rel)
+        with open(src, 'rb') as fh:
+            data = fh.read()
+        target = hashed_name(rel, hashlib.sha256(data).hexdigest())
+        _write(os.path.join(dist_dir, target), data)
+        written.add(target)
+        served = f'{dist_prefix}/{target}'
+        files[rel] = served
+
+        if rel.lower().endswith(COMPRESSIBLE):
+            variants = compress_variants(data)
+            for enc, (suffix, payload) in variants.items():
+                _write(os.path.join(dist_dir, target + suffix), payload)
+                written.add(target + suffix)
+                saved += len(data) - len(payload)
+            if variants:
+                encodings[served] = sorted(variants)
+
+    removed = 0
+    if not keep_old:
+        for dirpath, _, filenames in os.walk(dist_dir):
+            for fname in filenames:
+                rel = os.path.relpath(os.path.join(dirpath, fname), dist_dir).replace(os.sep, '/')
+                if rel != MANIFEST_NAME and rel not in written:
+                    os.remove(os.path.join(dirpath, fname))
+                    removed += 1
+
+    os.makedirs(dist_dir, exist_ok=True)
+    write_json_atomic(os.path.join(dist_dir, MANIFEST_NAME), {'files': files, 'encodings': encodings})
+    print(f'{len(files)} asset(s) fingerprinted, {len(encodings)} precompressed '
+          f'({saved / 1024:.1f} KiB saved across variants), {removed} stale file(s) removed')
+    return files, encodings
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fingerprint and precompress static assets')
+    parser.add_argument('--keep-old', action='store_true', help='Keep hashed files from previous builds')
+    parser.add_argument('--clean', action='store_true', help='Delete static/dist before building')
+    args = parser.parse_args()
+    if args.clean and os.path.isdir(DIST_DIR):
+        shutil.rmtree(DIST_DIR)
+    print('Using static dir:', STATIC_DIR)
+    build(keep_old=args.keep_old)
+
+
+if __name__ == '__main__':
+    main()
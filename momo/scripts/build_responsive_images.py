@@ -0,0 +1,158 @@
+"""
+Build resized AVIF/WebP variants of the images in `static/` for responsive <picture> markup.
+
+Usage:
+  - Install Pillow (build-time only): `pip install Pillow`
+    AVIF needs a Pillow build with libavif (Pillow >= 11.2) or `pip install pillow-avif-plugin`;
+    formats the installed Pillow cannot encode are skipped with a warning.
+  - Run: `python scripts/build_responsive_images.py [--widths 320,640,960,1280] [--formats avif,webp] [--workers N]`
+
+Variants are written to `static/responsive/<name>-<width>.<format>` and recorded in
+`static/responsive/manifest.json`, which the app reads at startup (see responsive_images.py).
+Images are encoded in parallel across CPU cores with a process pool. Builds are
+incremental: an image whose SHA-256 and build settings match the manifest, and whose
+variant files all exist, is not re-encoded. Widths larger than the source are not
+generated (the source width is used as the largest variant instead).
+"""
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from file_util import file_digest, load_json, write_json_atomic  # noqa: E402
+from responsive_images import DEFAULT_WIDTHS, MANIFEST_PATH  # noqa: E402
+
+STATIC_DIR = os.path.join(ROOT, 'static')
+OUT_DIR = os.path.dirname(MANIFEST_PATH)
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+QUALITY = {'avif': 50, 'webp': 78}
+
+
+def _require_pillow():
+    try:
+        from PIL import Image  # noqa: F401
+    except Exception:
+        print('Missing Pillow package. Install with `pip install Pillow`')
+        sys.exit(1)
+
+
+def supported_formats(requested):
+    from PIL import features
+    try:
+        import pillow_avif  # noqa: F401  registers the AVIF plugin on older Pillow
+    except Exception:
+        pass
+    available = []
+    for fmt in requested:
+        try:
+            ok = features.check(fmt)
+        except ValueError:
+            # Unknown feature name on this Pillow version; probe the encoder directly
+            from PIL import Image
+            ok = fmt.upper() in Image.SAVE
+        if ok:
+            available.append(fmt)
+        else:
+            print(f'WARNING: this Pillow build cannot encode {fmt}; skipping it')
+    return available
+
+
+def target_widths(source_width, widths):
+    chosen = sorted(w for w in widths if w < source_width)
+    # Never upscale; the largest variant is the requested maximum or the source width
+    chosen.append(min(source_width, max(widths)))
+    return sorted(set(chosen))
+
+
+def build_one(src_path, out_dir, widths, formats):
+    """Encode every variant of one image; runs in a worker process."""
+    from PIL import Image, ImageOps
+
+    name = os.path.splitext(os.path.basename(src_path))[0]
+    with Image.open(src_path) as img:
+        img = ImageOps.exif_transpose(img)
+        keep_alpha = img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info)
+        img = img.convert('RGBA' if keep_alpha else 'RGB')
+        source_width, source_height = img.size
+
+        variants = {fmt: [] for fmt in formats}
+        for width in target_widths(source_width, widths):
+            height = max(1, round(source_height * width / source_width))
+            resized = img if width == source_width else img.resize((width, height), Image.LANCZOS)
+            for fmt in formats:
+                rel_path = f'{os.path.basename(out_dir)}/{name}-{width}.{fmt}'
+                resized.save(os.path.join(out_dir, f'{name}-{width}.{fmt}'), fmt.upper(),
+                             quality=QUALITY.get(fmt, 75))
+                variants[fmt].append([width, rel_path])
+
+    return {'width': source_width, 'height': source_height, 'variants': variants}
+
+
+def is_current(entry, digest, settings, static_dir):
+    if not entry or entry.get('sha256') != digest or entry.get('settings') != settings:
+        return False
+    return all(os.path.exists(os.path.join(static_dir, path))
+               for pairs in entry.get('variants', {}).values() for _, path in pairs)
+
+
+def build(static_dir=STATIC_DIR, out_dir=OUT_DIR, widths=DEFAULT_WIDTHS, formats=('avif', 'webp'),
+          workers=None, force=False):
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, 'manifest.json')
+    manifest = load_json(manifest_path)
+
+    settings = {'widths': list(widths), 'formats': list(formats),
+                'quality': {fmt: QUALITY.get(fmt, 75) for fmt in formats}}
+    images = sorted(f for f in os.listdir(static_dir) if f.lower().endswith(IMAGE_EXTENSIONS))
+    digests = {f: file_digest(os.path.join(static_dir, f)) for f in images}
+    todo = [f for f in images if force or not is_current(manifest.get(f), digests[f], settings, static_dir)]
+    print(f'{len(images)} image(s), {len(todo)} to build, {len(images) - len(todo)} up to date')
+
+    failed = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(build_one, os.path.join(static_dir, f), out_dir, tuple(widths), tuple(formats)): f
+                   for f in todo}
+        for future in as_completed(futures):
+            fname = futures[future]
+            try:
+                entry = future.result()
+            except Exception as e:
+                print('Failed to build', fname, '->', e)
+                failed.append(fname)
+                continue
+            entry['sha256'] = digests[fname]
+            entry['settings'] = settings
+            manifest[fname] = entry
+            print(' ->', fname, ', '.join(f'{fmt}:{len(pairs)}' for fmt, pairs in entry['variants'].items()))
+
+    # Drop entries for images that no longer exist
+    manifest = {f: entry for f, entry in manifest.items() if f in digests}
+    write_json_atomic(manifest_path, manifest)
+    print('Manifest written to', manifest_path)
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build responsive AVIF/WebP image variants')
+    parser.add_argument('--widths', default=','.join(str(w) for w in DEFAULT_WIDTHS))
+    parser.add_argument('--formats', default='avif,webp')
+    parser.add_argument('--workers', type=int, default=None, help='Encoder processes (default: CPU count)')
+    parser.add_argument('--force', action='store_true', help='Rebuild every image')
+    args = parser.parse_args()
+
+    _require_pillow()
+    widths = sorted({int(w) for w in args.widths.split(',') if w.strip()})
+    formats = supported_formats([f.strip().lower() for f in args.formats.split(',') if f.strip()])
+    if not formats:
+        print('No requested format can be encoded by the installed Pillow')
+        sys.exit(1)
+
+    failed = build(widths=widths, formats=formats, workers=args.workers, force=args.force)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""
+Smoke-check that every shipped deploy config can import the app the way it starts it.
+
+Each config is read from the repository rather than restated here, so a change to a
+start command is checked as written:
+
+  - render.yaml:  `startCommand` (gunicorn, run from the repository root)
+  - Procfile:     the `web:` process (gunicorn, run from momo/)
+  - Dockerfile:   `CMD` (gunicorn, run from momo/, the build context)
+  - netlify.toml: the `api` function in the configured functions directory
+
+Every import runs in a fresh interpreter with DB_INIT_MODE=lazy, so no database is
+needed; a missing module or a bad app path fails the check.
+
+Usage:
+  - Run: `python scripts/check_deploy_imports.py`
+"""
+import json
+import os
+import re
+import shlex
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO = os.path.dirname(ROOT)
+
+# Mirrors gunicorn: --chdir is entered and put on sys.path before the app module is imported
+_GUNICORN_PROBE = '''
+import importlib, os, sys
+chdir, spec = sys.argv[1], sys.argv[2]
+if chdir:
+    os.chdir(chdir)
+sys.path.insert(0, os.getcwd())
+module, _, attr = spec.partition(':')
+app = getattr(importlib.import_module(module), attr or 'application')
+assert callable(app), f'{spec} is not a WSGI callable'
+'''
+
+_FUNCTION_PROBE = '''
+import importlib.util, sys
+spec = importlib.util.spec_from_file_location('api', sys.argv[1])
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+assert callable(getattr(module, 'handler', None)), 'no handler() in the function'
+'''
+
+
+def gunicorn_target(command):
+    """(chdir, 'module:attr') from a gunicorn command line."""
+    tokens = shlex.split(command)
+    if 'gunicorn' not in tokens:
+        raise ValueError(f'not a gunicorn command: {command}')
+    chdir, positional = '', []
+    args = iter(tokens[tokens.index('gunicorn') + 1:])
+    for token in args:
+        if token.startswith('-'):
+            name, has_value, value = token.partition('=')
+            value = value if has_value else next(args, '')
+            if name == '--chdir':
+                chdir = value
+        else:
+            positional.append(token)
+    if not positional:
+        raise ValueError(f'no app given in: {command}')
+    return chdir, positional[-1]
+
+
+def render_command():
+    with open(os.path.join(REPO, 'render.yaml'), encoding='utf-8') as fh:
+        match = re.search(r'^\s*startCommand:\s*(.+)$', fh.read(), re.MULTILINE)
+    return match.group(1).strip()
+
+
+def procfile_command():
+    with open(os.path.join(ROOT, 'Procfile'), encoding='utf-8') as fh:
+        for line in fh:
+            if line.startswith('web:'):
+                return line[len('web:'):].strip()
+    raise ValueError('no web process in the Procfile')
+
+
+def dockerfile_command():
+    with open(os.path.join(ROOT, 'Dockerfile'), encoding='utf-8') as fh:
+        match = re.search(r'^CMD\s+(\[.*\])\s*$', fh.read(), re.MULTILINE)
+    return shlex.join(json.loads(match.group(1)))
+
+
+def netlify_function():
+    with open(os.path.join(REPO, 'netlify.toml'), encoding='utf-8') as fh:
+        match = re.search(r'^\s*functions\s*=\s*"([^"]+)"', fh.read(), re.MULTILINE)
+    return os.path.join(REPO, match.group(1), 'api.py')
+
+
+def run_probe(args, cwd):
+    env = dict(os.environ, DB_INIT_MODE='lazy')
+    proc = subprocess.run([sys.executable, '-c', *args], cwd=cwd, env=env,
+                          capture_output=True, text=True, timeout=120)
+    if proc.returncode == 0:
+        return None
+    lines = (proc.stderr or proc.stdout).strip().splitlines()
+    return lines[-1] if lines else f'exit code {proc.returncode}'
+
+
+def main():
+    checks = []
+    for name, read_command, cwd in (('render.yaml', render_command, REPO),
+                                    ('Procfile', procfile_command, ROOT),
+                                    ('Dockerfile', dockerfile_command, ROOT)):
+        try:
+            chdir, spec = gunicorn_target(read_command())
+        except (OSError, AttributeError, ValueError) as e:
+            checks.append((name, '?', f'cannot read the start command: {e}'))
+            continue
+        checks.append((name, f'{chdir or "."} {spec}', run_probe([_GUNICORN_PROBE, chdir, spec], cwd)))
+
+    try:
+        path = netlify_function()
+        error = run_probe([_FUNCTION_PROBE, path], REPO) if os.path.exists(path) else f'{path} does not exist'
+        checks.append(('netlify.toml', os.path.relpath(path, REPO), error))
+    except (OSError, AttributeError) as e:
+        checks.append(('netlify.toml', '?', f'cannot read the functions directory: {e}'))
+
+    for name, target, error in checks:
+        print(f"{'FAIL' if error else 'ok  '} {name:<13} {target}" + (f'\n     {error}' if error else ''))
+    failed = sum(1 for _, _, error in checks if error)
+    print(f'{len(checks) - failed}/{len(checks)} deploy configs import the app')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
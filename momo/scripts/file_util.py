@@ -0,0 +1,39 @@
+"""
+File helpers shared by the build and sync scripts in this directory.
+"""
+import hashlib
+import json
+import os
+import tempfile
+
+
+def file_digest(path):
+    """Hex SHA-256 of a file, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_json(path):
+    """The JSON object in `path`, or {} when it is missing or unreadable."""
+    try:
+        with open(path, 'r', encoding='utf-8') as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_json_atomic(path, data):
+    """Write to a temp file in the same directory, then rename over `path`."""
+    fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', suffix='.json', dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as fh:
+            json.dump(data, fh, indent=2, sort_keys=True)
+            fh.write('\n')
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
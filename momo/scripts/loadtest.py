@@ -0,0 +1,320 @@
+"""
+End-to-end load test of the ordering flow.
+
+Each virtual user registers, logs in, and then repeatedly runs the shopping
+flow: replace the cart with a JSON post to /cart, add an item with a form post
+to /cart, change a quantity through /cart/update, place the order through
+/checkout and view /profile. Virtual users run concurrently on threads and
+start together. For every step the script reports request count, errors,
+throughput and p50/p95/p99 latency, and writes everything to a JSON file so
+results can be compared between commits.
+
+Targets:
+  - in-process (default): drives the app through the WSGI test client against
+    a throwaway database on the embedded SQLite backend (schema created by the
+    normal migrations), so no MySQL server is needed; --database-url points it
+    elsewhere. Login throttling is switched off and a cheap password hash is
+    used unless --app-hash is given, so the numbers show the request path
+    rather than the deliberate cost of scrypt.
+  - --url http://host:port: real HTTP against a running server (e.g. gunicorn),
+    with whatever database it is configured with. Disable or raise the login
+    throttle on that server first: every virtual user logs in from one IP.
+
+Usage:
+  - Run: `python scripts/loadtest.py [--users 8] [--iterations 5] [--url http://127.0.0.1:8000]`
+  - Compare: `python scripts/loadtest.py --compare loadtest_results/<previous>.json`
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, 'loadtest_results')
+
+STEPS = ('register', 'login', 'cart_json', 'cart_form', 'cart_update', 'checkout', 'profile')
+
+# Statuses that count as success for each step (form posts redirect on success)
+EXPECTED = {
+    'register': {302},
+    'login': {302},
+    'cart_json': {200},
+    'cart_form': {302},
+    'cart_update': {200},
+    'checkout': {200},
+    'profile': {200},
+}
+
+
+# -- clients ------------------------------------------------------------------
+
+class InProcessClient:
+    def __init__(self, app):
+        self._client = app.test_client()
+
+    def request(self, method, path, form=None, json_body=None):
+        response = self._client.open(path, method=method, data=form, json=json_body)
+        response.close()
+        return response.status_code
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class HttpClient:
+    def __init__(self, base_url, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self._opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect())
+
+    def request(self, method, path, form=None, json_body=None):
+        headers = {}
+        data = None
+        if json_body is not None:
+            data = json.dumps(json_body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        elif form is not None:
+            data = urllib.parse.urlencode(form).encode('utf-8')
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        req = urllib.request.Request(self.base_url + path, data=data, method=method, headers=headers)
+        try:
+            with self._opener.open(req, timeout=self.timeout) as resp:
+                resp.read()
+                return resp.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code
+
+
+# -- the flow -----------------------------------------------------------------
+
+class Recorder:
+    def __init__(self):
+        self.samples = {step: [] for step in STEPS}
+        self.errors = {step: 0 for step in STEPS}
+        self._lock = threading.Lock()
+
+    def timed(self, step, call):
+        started = time.perf_counter()
+        try:
+            status = call()
+        except Exception:
+            status = None
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.samples[step].append(elapsed)
+            if status not in EXPECTED[step]:
+                self.errors[step] += 1
+        return status
+
+
+def virtual_user(client, user_no, run_id, iterations, item_ids, recorder, barrier):
+    rng = random.Random(user_no)
+    username = f'lt_{run_id}_{user_no}'
+    password = f'pw-{run_id}-{user_no}'
+    barrier.wait()
+
+    recorder.timed('register', lambda: client.request('POST', '/register', form={
+        'username': username, 'password': password, 'email': f'{username}@example.test'}))
+    recorder.timed('login', lambda: client.request('POST', '/login', form={
+        'username': username, 'password': password}))
+
+    for _ in range(iterations):
+        picks = rng.sample(item_ids, 3)
+        recorder.timed('cart_json', lambda: client.request('POST', '/cart', json_body=[
+            {'id': picks[0], 'quantity': 2}, {'id': picks[1], 'quantity': 1}]))
+        recorder.timed('cart_form', lambda: client.request('POST', '/cart', form={
+            'item_id': picks[2], 'quantity': '1'}))
+        recorder.timed('cart_update', lambda: client.request('POST', '/cart/update', json_body={
+            'id': picks[0], 'action': 'update', 'quantity': 3}))
+        recorder.timed('checkout', lambda: client.request('POST', '/checkout', form={
+            'name': username, 'email': f'{username}@example.test',
+            'address': f'{user_no} Load Test Lane', 'payment': 'cod'}))
+        recorder.timed('profile', lambda: client.request('GET', '/profile'))
+
+
+def percentile(sorted_samples, pct):
+    if not sorted_samples:
+        return 0.0
+    rank = max(0, min(len(sorted_samples) - 1, int(round(pct / 100.0 * len(sorted_samples) + 0.5)) - 1))
+    return sorted_samples[rank]
+
+
+def summarise(recorder, wall):
+    steps = {}
+    all_samples = []
+    for step in STEPS:
+        samples = sorted(recorder.samples[step])
+        all_samples.extend(samples)
+        steps[step] = _summary(samples, recorder.errors[step], wall)
+    total = _summary(sorted(all_samples), sum(recorder.errors.values()), wall)
+    return steps, total
+
+
+def _summary(samples, errors, wall):
+    count = len(samples)
+    return {
+        'count': count,
+        'errors': errors,
+        'throughput_rps': count / wall if wall else 0.0,
+        'mean_ms': (sum(samples) / count * 1000) if count else 0.0,
+        'p50_ms': percentile(samples, 50) * 1000,
+        'p95_ms': percentile(samples, 95) * 1000,
+        'p99_ms': percentile(samples, 99) * 1000,
+        'max_ms': (samples[-1] * 1000) if count else 0.0,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def _in_process_app(args, database_url):
+    os.environ['DATABASE_URL'] = database_url
+    os.environ['MIGRATE_ON_STARTUP'] = 'true'
+    os.environ.setdefault('DB_INIT_MODE', 'lazy')
+    os.environ.setdefault('DB_POOL_SIZE', str(max(args.users, 5)))
+    os.environ.setdefault('LOGIN_THROTTLE_STORE', 'off')
+    os.environ.setdefault('METRICS_STORE', 'off')
+    if not args.app_hash:
+        os.environ['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:1000'
+    sys.path.insert(0, ROOT)
+    import app as app_module
+    return app_module
+
+
+def run(args):
+    run_id = datetime.now().strftime('%H%M%S') + f'{random.randrange(1000):03d}'
+    app_module = None
+    if args.url:
+        clients = [HttpClient(args.url) for _ in range(args.users)]
+        target = args.url
+    else:
+        database_url = args.database_url or 'sqlite:///' + os.path.join(
+            tempfile.mkdtemp(prefix='momo-loadtest-'), 'loadtest.db')
+        app_module = _in_process_app(args, database_url)
+        clients = [InProcessClient(app_module.app) for _ in range(args.users)]
+        target = f"in-process ({database_url.split(':', 1)[0]})"
+
+    sys.path.insert(0, ROOT)
+    from catalog import load_catalog
+    item_ids = [item.id for item in load_catalog()]
+
+    recorder = Recorder()
+    barrier = threading.Barrier(args.users + 1)
+    threads = [threading.Thread(target=virtual_user, daemon=True,
+                                args=(clients[n], n, run_id, args.iterations, item_ids, recorder, barrier))
+               for n in range(args.users)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    steps, total = summarise(recorder, wall)
+    result = {
+        'meta': {
+            'commit': _git_commit(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'target': target,
+            'users': args.users,
+            'iterations': args.iterations,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'wall_seconds': wall,
+        },
+        'steps': steps,
+        'total': total,
+    }
+    if app_module is not None:
+        if app_module.order_queue is not None:
+            app_module.order_queue.flush()
+        conn = app_module.db_pool.acquire()
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT COUNT(*) FROM orders o JOIN users u ON u.user_id = o.user_id "
+                        "WHERE u.username LIKE %s", (f'lt_{run_id}_%',))
+            result['meta']['orders_written'] = cur.fetchone()[0]
+            cur.close()
+        finally:
+            app_module.db_pool.release(conn)
+    return result
+
+
+def print_report(result, baseline=None):
+    meta = result['meta']
+    print(f"target={meta['target']} users={meta['users']} iterations={meta['iterations']} "
+          f"commit={meta['commit']} wall={meta['wall_seconds']:.2f}s")
+    header = f"{'step':<12} {'count':>6} {'errors':>6} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    if baseline:
+        header += f" {'p95 vs base':>12} {'rps vs base':>12}"
+    print(header)
+    rows = list(result['steps'].items()) + [('TOTAL', result['total'])]
+    for step, s in rows:
+        line = (f"{step:<12} {s['count']:>6} {s['errors']:>6} {s['throughput_rps']:>9.1f} "
+                f"{s['p50_ms']:>9.2f} {s['p95_ms']:>9.2f} {s['p99_ms']:>9.2f}")
+        base = (baseline or {}).get('steps', {}).get(step) if step != 'TOTAL' else (baseline or {}).get('total')
+        if base:
+            line += f" {_delta(s['p95_ms'], base['p95_ms']):>12} {_delta(s['throughput_rps'], base['throughput_rps']):>12}"
+        print(line)
+    if 'orders_written' in meta:
+        print(f"orders written: {meta['orders_written']}")
+
+
+def _delta(current, previous):
+    if not previous:
+        return 'n/a'
+    return f'{(current - previous) / previous * 100:+.1f}%'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test the register/login/cart/checkout/profile flow')
+    parser.add_argument('--users', type=int, default=8, help='Concurrent virtual users')
+    parser.add_argument('--iterations', type=int, default=5, help='Shopping flows per virtual user')
+    parser.add_argument('--url', help='Base URL of a running server (default: in-process)')
+    parser.add_argument('--database-url', help='In-process: database to use (default: a fresh SQLite file)')
+    parser.add_argument('--app-hash', action='store_true',
+                        help="In-process: keep the app's configured password hash method")
+    parser.add_argument('--output', help='Result file (default: loadtest_results/<commit>-<time>.json)')
+    parser.add_argument('--compare', help='Previous result file to compare against')
+    args = parser.parse_args()
+
+    result = run(args)
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as fh:
+            baseline = json.load(fh)
+    print_report(result, baseline)
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        output = os.path.join(RESULTS_DIR, f"{result['meta']['commit'] or 'nocommit'}-{stamp}.json")
+    with open(output, 'w', encoding='utf-8') as fh:
+        json.dump(result, fh, indent=2)
+    print('Results written to', output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+"""
+WSGI adapter for AWS Lambda-style events (Netlify Functions, API Gateway).
+
+`handle_event(app, event, context)` turns the event straight into a WSGI
+environ, calls the app and turns the WSGI response back into the Lambda
+result format. Compared with driving the app through `app.test_client()`:
+
+  - query strings are URL-encoded and keep repeated parameters;
+  - repeated request headers and cookies are preserved, and repeated
+    response headers (e.g. several Set-Cookie) are returned through
+    `multiValueHeaders` for v1 events; v2 has no multi-value headers, so
+    Set-Cookie values go in its `cookies` list and other repeated headers
+    are joined with commas;
+  - request and response bodies are bytes, so base64-encoded uploads,
+    images and compressed responses survive the round trip;
+  - every HTTP method (HEAD, PATCH, OPTIONS, ...) is passed through as-is;
+  - nothing is built per invocation: the app, its connection pool and
+    caches live at module level in the function and are reused for as long
+    as the container stays warm.
+
+Both the v1 (httpMethod/path) and v2 (requestContext.http/rawPath) event
+shapes are accepted.
+"""
+import base64
+import io
+import sys
+from urllib.parse import urlencode
+
+# Response types that can be returned as plain text; anything else is base64-encoded
+_TEXT_TYPES = ('text/', 'application/json', 'application/javascript', 'application/xml',
+               'application/xhtml+xml', 'image/svg+xml')
+
+
+def _request_headers(event):
+    """Merge single- and multi-value headers into {lower-name: [values]}."""
+    headers = {}
+    for name, values in (event.get('multiValueHeaders') or {}).items():
+        headers[name.lower()] = list(values or [])
+    for name, value in (event.get('headers') or {}).items():
+        headers.setdefault(name.lower(), [value])
+    cookies = event.get('cookies')
+    if cookies:
+        headers['cookie'] = ['; '.join(cookies)]
+    return headers
+
+
+def _query_string(event):
+    raw = event.get('rawQuery') or event.get('rawQueryString')
+    if raw:
+        return raw
+    multi = event.get('multiValueQueryStringParameters')
+    if multi:
+        return urlencode([(k, v) for k, values in multi.items() for v in (values or [])])
+    single = event.get('queryStringParameters')
+    if single:
+        return urlencode(list(single.items()))
+    return ''
+
+
+def event_to_environ(event, context=None):
+    http = (event.get('requestContext') or {}).get('http') or {}
+    method = (event.get('httpMethod') or http.get('method') or 'GET').upper()
+    path = event.get('path') or event.get('rawPath') or http.get('path') or '/'
+
+    body = event.get('body') or b''
+    if isinstance(body, str):
+        body = base64.b64decode(body) if event.get('isBase64Encoded') else body.encode('utf-8')
+
+    headers = _request_headers(event)
+    host = (headers.get('host') or ['localhost'])[0]
+    server_name, _, server_port = host.partition(':')
+    scheme = (headers.get('x-forwarded-proto') or ['https'])[0]
+    # The platform's own view of the peer first. X-Forwarded-For is client-supplied
+    # except for its last entry, which the platform's edge appended.
+    forwarded_for = ', '.join(headers.get('x-forwarded-for') or [])
+    source_ip = (((event.get('requestContext') or {}).get('identity') or {}).get('sourceIp')
+                 or http.get('sourceIp')
+                 or forwarded_for.split(',')[-1].strip()
+                 or '127.0.0.1')
+
+    environ = {
+        'REQUEST_METHOD': method,
+        'SCRIPT_NAME': '',
+        'PATH_INFO': path,
+        'QUERY_STRING': _query_string(event),
+        'SERVER_NAME': server_name,
+        'SERVER_PORT': server_port or ('443' if scheme == 'https' else '80'),
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'REMOTE_ADDR': source_ip,
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scheme,
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': False,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+        'lambda.event': event,
+        'lambda.context': context,
+    }
+    for name, values in headers.items():
+        if name == 'content-type':
+            environ['CONTENT_TYPE'] = values[0]
+        elif name == 'content-length':
+            continue
+        else:
+            separator = '; ' if name == 'cookie' else ', '
+            environ['HTTP_' + name.upper().replace('-', '_')] = separator.join(values)
+    return environ
+
+
+def _is_text(headers):
+    content_type = headers.get('content-type', '').lower()
+    if 'content-encoding' in headers:
+        return False
+    return content_type.startswith(_TEXT_TYPES)
+
+
+def _is_v2(event):
+    return event.get('version') == '2.0' or 'http' in (event.get('requestContext') or {})
+
+
+def handle_event(app, event, context=None):
+    """Run one Lambda event through the WSGI `app` and return the Lambda response dict."""
+    environ = event_to_environ(event, context)
+    status_headers = {}
+
+    def start_response(status, response_headers, exc_info=None):
+        status_headers['status'] = status
+        status_headers['headers'] = response_headers
+        return lambda data: chunks.append(data)
+
+    chunks = []
+    result = app(environ, start_response)
+    try:
+        for chunk in result:
+            if chunk:
+                chunks.append(chunk)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    body = b''.join(chunks)
+
+    multi = {}
+    for name, value in status_headers['headers']:
+        multi.setdefault(name, []).append(value)
+    lowered = {name.lower(): values[-1] for name, values in multi.items()}
+
+    response = {'statusCode': int(status_headers['status'].split(' ', 1)[0])}
+    if _is_v2(event):
+        # Set-Cookie cannot be comma-joined (cookie dates contain commas)
+        response['cookies'] = [v for name, values in multi.items() if name.lower() == 'set-cookie' for v in values]
+        response['headers'] = {name: ', '.join(values) for name, values in multi.items()
+                               if name.lower() != 'set-cookie'}
+    else:
+        response['headers'] = {name: values[-1] for name, values in multi.items()}
+        response['multiValueHeaders'] = multi
+    if environ['REQUEST_METHOD'] == 'HEAD' or not body:
+        response['body'] = ''
+        response['isBase64Encoded'] = False
+    elif _is_text(lowered):
+        response['body'] = body.decode('utf-8', errors='replace')
+        response['isBase64Encoded'] = False
+    else:
+        response['body'] = base64.b64encode(body).decode('ascii')
+        response['isBase64Encoded'] = True
+    return response
@@ -0,0 +1,30 @@
+"""
+Helpers for the small local SQLite files the app uses to share state between
+gunicorn workers on one host (server-side carts and similar stores).
+"""
+import sqlite3
+import threading
+
+
+def open_local_db(path, timeout=5.0):
+    """Open `path` in WAL mode so readers never block the (single) writer."""
+    conn = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+
+class ThreadLocalDB:
+    """One SQLite connection per thread, opened lazily."""
+
+    def __init__(self, path, timeout=5.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def get(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = open_local_db(self.path, self.timeout)
+            self._local.conn = conn
+        return conn
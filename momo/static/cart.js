@@ -47,60 +47,78 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     });
 
-    // Update cart on server
-    async function updateItemQuantity(itemId, quantity) {
-        try {
-            // Update local cart first
-            const cart = JSON.parse(localStorage.getItem('cart') || '[]');
-            const item = cart.find(i => i.id === itemId);
-            if (item) {
-                item.quantity = quantity;
-                localStorage.setItem('cart', JSON.stringify(cart));
-            }
+    // Pending server updates, coalesced per item: rapid clicks become one /cart/batch request
+    const pendingOps = new Map();
+    let flushTimer = null;
+    const FLUSH_DELAY_MS = 300;
+
+    function queueOp(itemId, op) {
+        pendingOps.set(itemId, op);
+        clearTimeout(flushTimer);
+        flushTimer = setTimeout(flushOps, FLUSH_DELAY_MS);
+    }
 
-            // Then sync with server
-            const response = await fetch('/cart', {
+    async function flushOps() {
+        if (pendingOps.size === 0) return;
+        const ops = Array.from(pendingOps.values());
+        pendingOps.clear();
+        try {
+            const response = await fetch('/cart/batch', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
                 },
-                body: JSON.stringify(cart)
+                body: JSON.stringify({ ops })
             });
 
             if (!response.ok) throw new Error('Failed to update cart');
-            
-            // Update UI
-            updateCartTotal();
-            updateItemTotal(itemId, item.price, quantity);
-            
+            const data = await response.json();
+            renderServerTotals(data.totals);
         } catch (err) {
             console.error('Failed to update cart:', err);
         }
     }
 
+    // Send anything still queued before the page goes away
+    window.addEventListener('pagehide', () => {
+        if (pendingOps.size === 0) return;
+        const body = JSON.stringify({ ops: Array.from(pendingOps.values()) });
+        pendingOps.clear();
+        fetch('/cart/batch', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body, keepalive: true });
+    });
+
+    // Update cart locally, then queue the server sync
+    function updateItemQuantity(itemId, quantity) {
+        const cart = JSON.parse(localStorage.getItem('cart') || '[]');
+        const item = cart.find(i => i.id === itemId);
+        if (item) {
+            item.quantity = quantity;
+            localStorage.setItem('cart', JSON.stringify(cart));
+        }
+
+        // Update UI immediately; server totals replace these once the batch returns
+        updateCartTotal();
+        if (item) updateItemTotal(itemId, item.price, quantity);
+
+        queueOp(itemId, { op: 'update', id: itemId, quantity });
+    }
+
     // Remove item from cart
-    async function removeItem(itemId) {
-        try {
-            const cart = JSON.parse(localStorage.getItem('cart') || '[]');
-            const newCart = cart.filter(i => i.id !== itemId);
-            localStorage.setItem('cart', JSON.stringify(newCart));
+    function removeItem(itemId) {
+        const cart = JSON.parse(localStorage.getItem('cart') || '[]');
+        const newCart = cart.filter(i => i.id !== itemId);
+        localStorage.setItem('cart', JSON.stringify(newCart));
 
-            // Sync with server
-            const response = await fetch('/cart', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify(newCart)
-            });
+        updateCartTotal();
+        queueOp(itemId, { op: 'remove', id: itemId });
+    }
 
-            if (!response.ok) throw new Error('Failed to update cart');
-            
-            // Update UI
-            updateCartTotal();
-            
-        } catch (err) {
-            console.error('Failed to remove item:', err);
+    // Server totals are authoritative (prices come from the menu catalog)
+    function renderServerTotals(totals) {
+        if (!totals) return;
+        const totalEl = document.querySelector('.cart-total strong');
+        if (totalEl) {
+            totalEl.textContent = `$${Number(totals.total).toFixed(2)}`;
         }
     }
 
@@ -0,0 +1,84 @@
+// Kitchen dashboard: polls /api/kitchen (a 304 while nothing changed) and advances orders
+document.addEventListener('DOMContentLoaded', () => {
+    const grid = document.querySelector('.kitchen-grid');
+    if (!grid) return; // Not signed in
+
+    const transitions = JSON.parse(grid.dataset.transitions);
+    const labels = {
+        confirmed: 'Confirm', preparing: 'Start', ready: 'Ready',
+        out_for_delivery: 'Out for delivery', cancelled: 'Cancel'
+    };
+    const summary = document.getElementById('kitchen-summary');
+    const prepList = document.getElementById('prep-counts');
+    const tickets = document.getElementById('tickets');
+
+    const el = (tag, text, className) => {
+        const node = document.createElement(tag);
+        if (text !== undefined) node.textContent = text;
+        if (className) node.className = className;
+        return node;
+    };
+
+    function render(data) {
+        const counts = data.by_status;
+        summary.textContent = `${data.orders.length} open orders — ${counts.pending} new, ` +
+            `${counts.confirmed} confirmed, ${counts.preparing} cooking, ${counts.ready} ready`;
+
+        prepList.replaceChildren(...data.prep_counts.map((dish) => {
+            const li = el('li');
+            li.append(el('span', dish.name), el('strong', `× ${dish.quantity}`));
+            return li;
+        }));
+        if (!data.prep_counts.length) prepList.append(el('li', 'Nothing to cook', 'muted'));
+
+        tickets.replaceChildren(...data.orders.map((order) => {
+            const card = el('article', undefined, 'kitchen-card ticket');
+            card.dataset.status = order.status;
+            const header = el('header');
+            header.append(el('strong', `#${order.order_id}`), el('span', order.label, 'muted'));
+            const items = el('ul');
+            items.append(...order.items.map((it) => {
+                const li = el('li');
+                li.append(el('span', it.name), el('strong', `× ${it.quantity}`));
+                return li;
+            }));
+            const meta = el('p', `${order.name || ''} · ${order.created_at || ''}`, 'muted small');
+            const actions = el('div', undefined, 'actions');
+            (transitions[order.status] || []).forEach((next) => {
+                const button = el('button', labels[next] || next);
+                button.type = 'button';
+                button.addEventListener('click', () => advance(order.order_ref, next, button));
+                actions.append(button);
+            });
+            card.append(header, items, meta, actions);
+            return card;
+        }));
+    }
+
+    async function refresh() {
+        try {
+            // The browser revalidates with If-None-Match; a 304 arrives here as the cached 200
+            const response = await fetch(grid.dataset.api, { cache: 'no-cache' });
+            if (response.ok) render(await response.json());
+        } catch (e) {
+            summary.textContent = 'Connection lost, retrying…';
+        }
+    }
+
+    async function advance(orderRef, status, button) {
+        button.disabled = true;
+        const response = await fetch(`/orders/${orderRef}/status`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ status })
+        });
+        if (!response.ok) {
+            const body = await response.json().catch(() => ({}));
+            alert(body.error || 'Could not update the order');
+        }
+        refresh();
+    }
+
+    refresh();
+    setInterval(refresh, parseFloat(grid.dataset.refresh) * 1000);
+});
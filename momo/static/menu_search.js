@@ -0,0 +1,42 @@
+// Menu search box: asks /api/menu/search which items match and hides the rest
+document.addEventListener('DOMContentLoaded', () => {
+    const form = document.querySelector('.menu-search');
+    if (!form) return; // Not on the menu page
+
+    const count = form.querySelector('.menu-search-count');
+    const items = document.querySelectorAll('.menu-item');
+    let timer = null;
+    let latest = 0;
+
+    async function search() {
+        const params = new URLSearchParams();
+        new FormData(form).forEach((value, key) => {
+            if (String(value).trim()) params.append(key, String(value).trim());
+        });
+        const filtered = [...params.keys()].length > 0;
+        const request = ++latest;
+        if (!filtered) {
+            items.forEach(item => item.classList.remove('search-hidden'));
+            count.textContent = '';
+            return;
+        }
+        try {
+            const response = await fetch(`${form.dataset.api}?${params}`);
+            if (!response.ok || request !== latest) return; // Keep the last good result
+            const data = await response.json();
+            const ids = new Set(data.items.map(it => it.id));
+            items.forEach(item => {
+                const button = item.querySelector('[data-id]');
+                item.classList.toggle('search-hidden', !button || !ids.has(button.dataset.id));
+            });
+            count.textContent = data.total === 1 ? '1 match' : `${data.total} matches`;
+        } catch (e) {
+            console.warn('Menu search failed', e);
+        }
+    }
+
+    form.addEventListener('input', () => {
+        clearTimeout(timer);
+        timer = setTimeout(search, 150);
+    });
+});
@@ -0,0 +1,39 @@
+// Live order status (Server-Sent Events from /orders/<ref>/events)
+document.addEventListener('DOMContentLoaded', () => {
+    const tracker = document.querySelector('[data-order-events]');
+    if (!tracker || !window.EventSource) return; // Nothing to track, or no SSE support
+
+    const label = tracker.querySelector('.order-status-label');
+    const cancel = tracker.querySelector('.order-cancel');
+    const finalStatuses = ['delivered', 'cancelled'];
+    // Statuses the server still accepts a cancellation from (order_status.CANCELLABLE_STATUSES)
+    const cancellable = (tracker.dataset.cancellable || 'pending').split(' ');
+
+    const source = new EventSource(tracker.dataset.orderEvents);
+    source.addEventListener('status', (e) => {
+        const data = JSON.parse(e.data);
+        tracker.dataset.status = data.status;
+        label.textContent = data.label;
+        if (cancel) cancel.hidden = !cancellable.includes(data.status);
+        if (finalStatuses.includes(data.status)) source.close();
+    });
+
+    if (cancel) {
+        cancel.addEventListener('click', async () => {
+            cancel.disabled = true;
+            try {
+                const response = await fetch(cancel.dataset.url, {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: '{}'
+                });
+                if (!response.ok) {
+                    const body = await response.json().catch(() => ({}));
+                    alert(body.error || 'This order can no longer be cancelled');
+                }
+            } finally {
+                cancel.disabled = false;
+            }
+        });
+    }
+});
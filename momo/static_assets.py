@@ -0,0 +1,70 @@
+"""
+Fingerprinted static assets built by `scripts/build_assets.py`.
+
+The build copies files from static/ to static/dist/ under content-hashed names
+(style.css -> dist/style.3f2a1b9c0d.css) and, for text assets, writes
+precompressed `.gz` and `.br` siblings. static/dist/manifest.json records both:
+
+    {"files": {"style.css": "dist/style.3f2a1b9c0d.css", ...},
+     "encodings": {"dist/style.3f2a1b9c0d.css": ["br", "gzip"], ...}}
+
+Because a hashed name never changes content, the files can be cached by
+browsers and CDNs for a year without revalidation; a deploy that changes a
+file changes its URL. The app rewrites `url_for('static', filename=...)` to
+the hashed name through a url_defaults hook, and serves /static/dist/ itself
+so it can pick the precompressed variant from Accept-Encoding.
+"""
+import json
+import mimetypes
+import os
+
+DIST_DIR = os.path.join(os.path.dirname(__file__), 'static', 'dist')
+MANIFEST_NAME = 'manifest.json'
+
+# Content-Encoding token -> file suffix, in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+class AssetManifest:
+    def __init__(self, files=None, encodings=None):
+        self.files = dict(files or {})
+        self.encodings = {path: tuple(encs) for path, encs in (encodings or {}).items()}
+        # Paths relative to dist/ that the /static/dist/ route may serve
+        self.served = {path.split('/', 1)[1]: path for path in self.files.values()}
+
+    def __bool__(self):
+        return bool(self.files)
+
+    def hashed(self, filename):
+        return self.files.get(filename)
+
+    def pick(self, dist_path, accept_encodings):
+        """
+        Return (file suffix, content encoding) for the best precompressed variant
+        of `dist_path` that the client accepts, or ('', None) for the plain file.
+        `accept_encodings` is the request's parsed Accept-Encoding header.
+        """
+        available = self.encodings.get(self.served.get(dist_path, ''), ())
+        for encoding, suffix in ENCODINGS:
+            if encoding in available and accept_encodings.quality(encoding) > 0:
+                return suffix, encoding
+        return '', None
+
+    def compressible(self, dist_path):
+        return bool(self.encodings.get(self.served.get(dist_path, '')))
+
+
+def load_asset_manifest(dist_dir=DIST_DIR):
+    try:
+        with open(os.path.join(dist_dir, MANIFEST_NAME), 'r', encoding='utf-8') as fh:
+            data = json.load(fh)
+    except Exception:
+        return AssetManifest()
+    return AssetManifest(data.get('files'), data.get('encodings'))
+
+
+def guess_type(path):
+    mimetype, _ = mimetypes.guess_type(path)
+    return mimetype or 'application/octet-stream'